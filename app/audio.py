@@ -0,0 +1,85 @@
+# app/audio.py
+
+import struct
+import wave
+from typing import Any, Dict
+import numpy as np
+
+SAMPLE_RATE = 16000
+SILENCE_FRAME_SECONDS = 0.03
+SILENCE_THRESHOLD_DBFS = -40.0
+
+def data_offset(file_path: str) -> int:
+    """Byte offset of the sample data in a RIFF/WAVE file."""
+    with open(file_path, "rb") as f:
+        if f.read(12)[8:] != b"WAVE":
+            raise ValueError(f"Not a WAV file: {file_path}")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in {file_path}")
+            chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+            if chunk_id == b"data":
+                return f.tell()
+            f.seek(size + size % 2, 1)
+
+def _to_float(samples: np.ndarray) -> np.ndarray:
+    """Scale 16-bit samples to float32 in [-1, 1], with the float array as the only full-size copy."""
+    audio = samples.astype(np.float32)
+    audio *= 1 / 32768.0
+    return audio
+
+def load_audio(file_path: str, mmap: bool = True) -> np.ndarray:
+    """
+    Decode a 16-bit PCM WAV (as written by the ingest path) into a float32
+    array in [-1, 1]. With `mmap`, samples are read through a memory map
+    instead of being copied into memory first, so the float32 result is
+    the only full-size array.
+    """
+    with wave.open(file_path, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"Expected 16-bit mono PCM WAV: {file_path}")
+        if wav.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"Expected {SAMPLE_RATE} Hz audio, got {wav.getframerate()} Hz: {file_path}")
+        frames = wav.getnframes()
+        if not mmap:
+            samples = np.frombuffer(wav.readframes(frames), dtype="<i2")
+            return _to_float(samples)
+
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.memmap(file_path, dtype="<i2", mode="r", offset=data_offset(file_path), shape=(frames,))
+    return _to_float(samples)
+
+def load_segment(file_path: str, start: int, end: int) -> np.ndarray:
+    """Decode samples [start, end) of a WAV written by the ingest path, reading only that range."""
+    with wave.open(file_path, "rb") as wav:
+        frames = wav.getnframes()
+    start, end = max(0, start), min(end, frames)
+    if end <= start:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.memmap(file_path, dtype="<i2", mode="r", offset=data_offset(file_path) + 2 * start, shape=(end - start,))
+    return _to_float(samples)
+
+def describe(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Dict[str, Any]:
+    """Duration, level and silence statistics of a decoded signal, stored as `audio_file_details`."""
+    duration = len(audio) / sample_rate
+    if len(audio) == 0:
+        return {"duration": 0.0, "sample_rate": sample_rate, "rms": 0.0, "silence_ratio": 1.0}
+
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+    frame = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+    usable = len(audio) - len(audio) % frame
+    if usable:
+        frame_rms = np.sqrt(np.mean(np.square(audio[:usable].reshape(-1, frame), dtype=np.float64), axis=1))
+        threshold = 10 ** (SILENCE_THRESHOLD_DBFS / 20)
+        silence_ratio = float(np.mean(frame_rms < threshold))
+    else:
+        silence_ratio = 0.0
+
+    return {
+        "duration": round(duration, 3),
+        "sample_rate": sample_rate,
+        "rms": round(rms, 6),
+        "silence_ratio": round(silence_ratio, 4),
+    }
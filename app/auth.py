@@ -1,13 +1,19 @@
 # app/auth.py
 
-from datetime import datetime, timedelta
-from typing import Optional
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
+from loguru import logger
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from . import models, database, config
+from . import models, database, config, executors, metrics
+from .cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -16,27 +22,146 @@ SECRET_KEY = config.settings.SECRET_KEY
 ALGORITHM = config.settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = config.settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+class Principal(NamedTuple):
+    """The authenticated API key, as carried by the token and cached between requests."""
+    id: int
+    username: str
+    key_version: int = 1
+    rate_limit_per_minute: Optional[float] = None  # Overrides of the upload rate limit settings
+    rate_limit_burst: Optional[int] = None
+
+# Principals confirmed to exist, keyed by username.
+principal_cache = TTLCache(config.settings.PRINCIPAL_CACHE_TTL_SECONDS, config.settings.PRINCIPAL_CACHE_SIZE)
+
+# Every change to a key (creation, rotation, revocation, rate limits) moves its
+# api_keys.updated_at. Each process polls for changed rows at most every
+# PRINCIPAL_INVALIDATION_POLL_SECONDS and drops their cached principals, so a
+# key changed by create_user.py or another replica stops being honoured here
+# within one poll instead of one cache TTL. Polls re-read a few seconds before
+# the newest change seen, for writers whose clocks or commits lag.
+CHANGE_OVERLAP = timedelta(seconds=5)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_changes_seen: Optional[datetime] = None
+_changes_polled = 0.0
+
+def invalidate_principal(username: str) -> None:
+    """Drop the cached principal of `username` in this process."""
+    principal_cache.delete(username)
+
+def _as_utc(value: datetime) -> datetime:
+    # PostgreSQL returns aware timestamps, SQLite naive ones in UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def poll_key_changes() -> int:
+    """Drop cached principals of keys changed since the last poll; returns how many keys changed."""
+    global _changes_seen
+    db = database.SessionLocal()
+    try:
+        if _changes_seen is None:
+            newest = db.query(func.max(models.APIKey.updated_at)).scalar()
+            _changes_seen = _as_utc(newest) if newest is not None else EPOCH
+            return 0
+        changed = (
+            db.query(models.APIKey.username, models.APIKey.updated_at)
+            .filter(models.APIKey.updated_at > _changes_seen - CHANGE_OVERLAP)
+            .all()
+        )
+    finally:
+        db.close()
+    for username, updated_at in changed:
+        invalidate_principal(username)
+        _changes_seen = max(_changes_seen, _as_utc(updated_at))
+    return len(changed)
+
+async def refresh_principal_cache() -> None:
+    """Run `poll_key_changes` if the last poll is older than PRINCIPAL_INVALIDATION_POLL_SECONDS."""
+    global _changes_polled
+    if principal_cache.ttl <= 0 or time.monotonic() - _changes_polled < config.settings.PRINCIPAL_INVALIDATION_POLL_SECONDS:
+        return
+    _changes_polled = time.monotonic()  # Before awaiting, so concurrent requests do not poll too
+    try:
+        await executors.run_io(poll_key_changes)
+    except Exception as e:
+        # Cached principals still expire after PRINCIPAL_CACHE_TTL_SECONDS
+        logger.warning(f"Failed to poll API key changes: {e}")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def get_user(db: Session, username: str):
+    return (
+        db.query(models.APIKey)
+        .filter(models.APIKey.username == username, models.APIKey.revoked_at.is_(None))
+        .first()
+    )
+
 def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.APIKey).filter(models.APIKey.username == username).first()
+    user = get_user(db, username)
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
         return False
     return user
 
+def token_claims(user) -> dict:
+    """Claims identifying `user`; tokens of an earlier version of a rotated key are rejected."""
+    return {"sub": user.username, "ver": user.key_version}
+
+def load_principal(username: str) -> Optional[Principal]:
+    db = database.SessionLocal()
+    try:
+        user = get_user(db, username)
+        if user is None:
+            return None
+        return Principal(
+            id=user.id,
+            username=user.username,
+            key_version=user.key_version,
+            rate_limit_per_minute=user.rate_limit_per_minute,
+            rate_limit_burst=user.rate_limit_burst,
+        )
+    finally:
+        db.close()
+
+# Recently verified logins: keyed hash of username+password -> the password hash it matched.
+# A changed password no longer matches the stored hash, so stale entries are never honoured.
+credential_cache = TTLCache(config.settings.CREDENTIAL_CACHE_TTL_SECONDS, config.settings.CREDENTIAL_CACHE_SIZE)
+
+login_latency = metrics.histogram("auth_login_seconds", "Password check latency in /token, by path")
+
+def credential_key(username: str, password: str) -> str:
+    message = username.encode() + b"\0" + password.encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """authenticate_user without blocking the event loop; bcrypt runs on the bounded auth pool."""
+    user = await executors.run_io(get_user, db, username)
+    if not user:
+        return False
+
+    started = time.perf_counter()
+    key = credential_key(username, password)
+    if credential_cache.get(key) == user.hashed_password:
+        login_latency.observe(time.perf_counter() - started, path="cached")
+        return user
+
+    verified = await executors.run_in("auth", verify_password, password, user.hashed_password)
+    login_latency.observe(time.perf_counter() - started, path="bcrypt")
+    if not verified:
+        return False
+    credential_cache.set(key, user.hashed_password)
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,7 +174,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.APIKey).filter(models.APIKey.username == username).first()
-    if user is None:
+
+    await refresh_principal_cache()
+    principal = principal_cache.get(username)
+    if principal is None:
+        principal = await executors.run_io(load_principal, username)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.set(username, principal)
+    # Tokens issued before versioned claims carry no "ver"; they expire within ACCESS_TOKEN_EXPIRE_MINUTES
+    version = payload.get("ver")
+    if version is not None and version != principal.key_version:
         raise credentials_exception
-    return user
+    return principal
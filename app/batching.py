@@ -0,0 +1,82 @@
+# app/batching.py
+
+from itertools import groupby
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from loguru import logger
+from .config import settings
+from . import model_registry
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30  # WhisperX merges VAD segments into windows of at most this length
+
+def supports_cross_file_batching(model) -> bool:
+    """Whether the loaded pipeline exposes the VAD/tokenizer internals the batched path relies on."""
+    return all(hasattr(model, name) for name in ("vad_model", "_vad_params", "tokenizer", "model"))
+
+def _vad_chunks(model, audio) -> List[Dict[str, Any]]:
+    import torch
+    from whisperx.vad import merge_chunks
+    segments = model.vad_model({"waveform": torch.from_numpy(audio).unsqueeze(0), "sample_rate": SAMPLE_RATE})
+    return merge_chunks(
+        segments,
+        CHUNK_SECONDS,
+        onset=model._vad_params["vad_onset"],
+        offset=model._vad_params["vad_offset"],
+    )
+
+def _use_language(model, language: str) -> None:
+    import faster_whisper
+    tokenizer = model.tokenizer
+    if tokenizer is None or tokenizer.language_code != language or tokenizer.task != "transcribe":
+        model.tokenizer = faster_whisper.tokenizer.Tokenizer(
+            model.model.hf_tokenizer,
+            model.model.model.is_multilingual,
+            task="transcribe",
+            language=language,
+        )
+
+def transcribe_batch(items: List[Tuple[np.ndarray, str]], batch_size: int = None) -> List[Dict[str, Any]]:
+    """
+    Transcribe several files together: VAD chunks from all files sharing a
+    language are fed through the model in common forward passes, and the
+    decoded text is scattered back per file.
+
+    `items` are (decoded 16 kHz audio, language) pairs; results match `model.transcribe`.
+    """
+    if not items:
+        return []
+    batch_size = batch_size or settings.WHISPER_BATCH_SIZE
+    results: List[Dict[str, Any]] = [{"segments": [], "language": language} for _, language in items]
+
+    with model_registry.whisper_model() as model:
+        if not supports_cross_file_batching(model):
+            logger.warning("WhisperX pipeline lacks batching internals; transcribing files one by one.")
+            for index, (audio, language) in enumerate(items):
+                results[index] = model.transcribe(audio, language=language, batch_size=batch_size)
+            return results
+
+        original_tokenizer = model.tokenizer
+        try:
+            by_language = sorted(range(len(items)), key=lambda index: items[index][1])
+            for language, indices in groupby(by_language, key=lambda index: items[index][1]):
+                _use_language(model, language)
+                pieces = []
+                for index in indices:
+                    audio = items[index][0]
+                    pieces.extend((index, chunk, audio) for chunk in _vad_chunks(model, audio))
+
+                inputs = (
+                    {"inputs": audio[int(chunk["start"] * SAMPLE_RATE):int(chunk["end"] * SAMPLE_RATE)]}
+                    for _, chunk, audio in pieces
+                )
+                outputs = model(inputs, batch_size=batch_size, num_workers=0)
+                for (index, chunk, _), output in zip(pieces, outputs):
+                    results[index]["segments"].append({
+                        "text": output["text"],
+                        "start": round(chunk["start"], 3),
+                        "end": round(chunk["end"], 3),
+                    })
+        finally:
+            model.tokenizer = original_tokenizer
+    return results
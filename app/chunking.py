@@ -0,0 +1,179 @@
+# app/chunking.py
+
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+from loguru import logger
+from .config import settings
+from .audio import SAMPLE_RATE, SILENCE_FRAME_SECONDS, load_segment
+
+# Long recordings are cut into chunks at the quietest point near every
+# TRANSCRIBE_CHUNK_SECONDS mark. Each chunk also covers TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+# of audio past its cut points, so a word the silence detector cut through is
+# still heard whole by one of the two chunks; stitching keeps every segment
+# from the chunk that owns its midpoint and drops repeats across the seam.
+SILENCE_RUN_SECONDS = 0.3  # Pauses shorter than this are not preferred as cut points
+
+def is_long(audio: np.ndarray) -> bool:
+    return len(audio) > settings.LONG_AUDIO_SECONDS * SAMPLE_RATE and chunk_workers() > 0
+
+def _frame_energy(audio: np.ndarray) -> np.ndarray:
+    frame = int(SILENCE_FRAME_SECONDS * SAMPLE_RATE)
+    usable = len(audio) - len(audio) % frame
+    energy = np.mean(np.square(audio[:usable].reshape(-1, frame), dtype=np.float64), axis=1)
+    # Smooth over a short run so a single quiet frame inside a word is not chosen
+    run = max(1, int(SILENCE_RUN_SECONDS / SILENCE_FRAME_SECONDS))
+    return np.convolve(energy, np.ones(run) / run, mode="same")
+
+def split_points(audio: np.ndarray, chunk_seconds: float, search_seconds: Optional[float] = None) -> List[float]:
+    """Cut points in seconds: the quietest moment within `search_seconds` of each `chunk_seconds` mark."""
+    duration = len(audio) / SAMPLE_RATE
+    if duration <= chunk_seconds:
+        return []
+    search_seconds = chunk_seconds / 10 if search_seconds is None else search_seconds
+    energy = _frame_energy(audio)
+    points = []
+    target = chunk_seconds
+    while target < duration - search_seconds:
+        low = int((target - search_seconds) / SILENCE_FRAME_SECONDS)
+        high = min(len(energy), int((target + search_seconds) / SILENCE_FRAME_SECONDS) + 1)
+        point = (low + int(np.argmin(energy[low:high])) + 0.5) * SILENCE_FRAME_SECONDS
+        points.append(round(point, 3))
+        target = point + chunk_seconds
+    return points
+
+def plan_chunks(audio: np.ndarray, chunk_seconds: float, overlap_seconds: float) -> List[Dict[str, float]]:
+    """
+    Chunks covering the signal. `start`/`end` delimit the audio each chunk
+    transcribes (cut points widened by the overlap); `owns_from`/`owns_to`
+    delimit the segments it contributes to the stitched result.
+    """
+    duration = len(audio) / SAMPLE_RATE
+    bounds = [0.0] + split_points(audio, chunk_seconds) + [duration]
+    return [
+        {
+            "start": max(0.0, owns_from - overlap_seconds),
+            "end": min(duration, owns_to + overlap_seconds),
+            "owns_from": owns_from,
+            "owns_to": owns_to,
+        }
+        for owns_from, owns_to in zip(bounds, bounds[1:])
+    ]
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text).strip().lower()
+
+def stitch(chunks: List[Dict[str, float]], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shift chunk segments to file time, keep each chunk's owned segments and drop repeats across seams."""
+    segments: List[Dict[str, Any]] = []
+    for chunk, result in zip(chunks, results):
+        for segment in result["segments"]:
+            start = segment["start"] + chunk["start"]
+            end = segment["end"] + chunk["start"]
+            if not chunk["owns_from"] <= (start + end) / 2 < chunk["owns_to"]:
+                continue
+            shifted = {**segment, "start": round(start, 3), "end": round(end, 3)}
+            if segments and start < segments[-1]["end"]:
+                # Both chunks heard the same words around the seam; keep the fuller rendering
+                text, previous = _normalize(segment["text"]), _normalize(segments[-1]["text"])
+                if text in previous:
+                    continue
+                if previous in text:
+                    segments[-1] = shifted
+                    continue
+            segments.append(shifted)
+    return segments
+
+# Process pool
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_chunk_workers: Optional[int] = None
+
+def model_memory_mb(chunk_workers: int) -> int:
+    """
+    Model memory of this host's job workers with `chunk_workers` each. A job
+    worker holds WHISPER_MODEL_INSTANCES Whisper models and up to
+    MODEL_CACHE_MAX_MB of alignment and diarization models; each of its
+    chunk processes loads one more Whisper model.
+    """
+    from . import model_registry
+    per_worker = settings.MODEL_CACHE_MAX_MB + (settings.WHISPER_MODEL_INSTANCES + chunk_workers) * model_registry.whisper_model_mb()
+    return max(settings.JOB_WORKERS, 1) * per_worker
+
+def chunk_workers() -> int:
+    """TRANSCRIBE_CHUNK_WORKERS, shrunk until `model_memory_mb` fits MODEL_MEMORY_BUDGET_MB."""
+    global _chunk_workers
+    if _chunk_workers is None:
+        configured = settings.TRANSCRIBE_CHUNK_WORKERS
+        _chunk_workers = configured
+        if configured > 0 and settings.MODEL_MEMORY_BUDGET_MB:
+            while _chunk_workers > 0 and model_memory_mb(_chunk_workers) > settings.MODEL_MEMORY_BUDGET_MB:
+                _chunk_workers -= 1
+            if _chunk_workers < configured:
+                logger.warning(
+                    f"Using {_chunk_workers} of {configured} chunk workers: {model_memory_mb(configured)} MB of models "
+                    f"would exceed MODEL_MEMORY_BUDGET_MB={settings.MODEL_MEMORY_BUDGET_MB}."
+                )
+        if _chunk_workers > 0:
+            logger.info(f"Chunked transcription with {_chunk_workers} processes per job worker; models need ~{model_memory_mb(_chunk_workers)} MB on this host.")
+    return _chunk_workers
+
+def _init_chunk_worker(threads: int) -> None:
+    from . import logging_config
+    logging_config.setup_logging()
+    # Share the cores between the pool's models instead of each claiming all of them
+    settings.WHISPER_CPU_THREADS = threads
+
+def _transcribe_chunk(file_path: str, start: float, end: float, language: str, batch_size: int) -> Dict[str, Any]:
+    from . import model_registry
+    audio = load_segment(file_path, int(start * SAMPLE_RATE), int(end * SAMPLE_RATE))
+    with model_registry.whisper_model() as model:
+        return model.transcribe(audio, language=language, batch_size=batch_size)
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """The chunk transcription pool of this process, started on first use; `workers` overrides `chunk_workers()`."""
+    global _pool, _pool_workers
+    workers = workers or chunk_workers()
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+            threads = settings.WHISPER_CPU_THREADS or max(1, (multiprocessing.cpu_count() or 1) // workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(threads,),
+            )
+            _pool_workers = workers
+            logger.info(f"Started chunk transcription pool with {workers} processes ({threads} threads each).")
+        return _pool
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+def transcribe_long(file_path: str, audio: np.ndarray, language: str, workers: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Transcribe a long recording as overlapping chunks in parallel processes.
+    `audio` is the decoded file, used to place the cut points; workers read
+    their own slices from `file_path`. The result matches `model.transcribe`.
+    """
+    batch_size = batch_size or settings.WHISPER_BATCH_SIZE
+    chunks = plan_chunks(audio, settings.TRANSCRIBE_CHUNK_SECONDS, settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS)
+    pool = get_pool(workers)
+    logger.info(f"Transcribing {len(audio) / SAMPLE_RATE:.0f}s of audio as {len(chunks)} chunks.")
+    futures = [
+        pool.submit(_transcribe_chunk, file_path, chunk["start"], chunk["end"], language, batch_size)
+        for chunk in chunks
+    ]
+    results = [future.result() for future in futures]
+    return {"segments": stitch(chunks, results), "language": language}
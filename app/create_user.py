@@ -1,20 +1,74 @@
 # create_user.py
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app import models, database, auth
 
+# API processes notice changes through api_keys.updated_at, see app/auth.py
+
 def create_user(username: str, password: str):
+    """Create a key, or rotate an existing or revoked one: tokens issued for its old version stop working."""
     db: Session = next(database.get_db())
     hashed_password = auth.get_password_hash(password)
-    user = models.APIKey(username=username, hashed_password=hashed_password)
-    db.add(user)
+    user = db.query(models.APIKey).filter(models.APIKey.username == username).first()
+    if user is None:
+        db.add(models.APIKey(username=username, hashed_password=hashed_password))
+        action = "created"
+    else:
+        user.hashed_password = hashed_password
+        user.revoked_at = None
+        user.key_version += 1
+        action = "rotated"
+    db.commit()
+    auth.invalidate_principal(username)
+    print(f"User {username} {action} successfully.")
+
+def revoke_user(username: str):
+    db: Session = next(database.get_db())
+    revoked = (
+        db.query(models.APIKey)
+        .filter(models.APIKey.username == username, models.APIKey.revoked_at.is_(None))
+        .update({
+            "revoked_at": func.now(),
+            "key_version": models.APIKey.key_version + 1,
+            "updated_at": func.now(),
+        })
+    )
     db.commit()
-    db.refresh(user)
-    print(f"User {username} created successfully.")
+    auth.invalidate_principal(username)
+    if revoked:
+        print(f"User {username} revoked successfully.")
+    else:
+        print(f"User {username} not found.")
+
+def set_rate_limit(username: str, per_minute: float = None, burst: int = None):
+    """Override the upload rate limit of one key; None restores the defaults."""
+    db: Session = next(database.get_db())
+    updated = (
+        db.query(models.APIKey)
+        .filter(models.APIKey.username == username, models.APIKey.revoked_at.is_(None))
+        .update({"rate_limit_per_minute": per_minute, "rate_limit_burst": burst, "updated_at": func.now()})
+    )
+    db.commit()
+    auth.invalidate_principal(username)
+    if updated:
+        print(f"Rate limit of {username} set to {per_minute if per_minute is not None else 'default'} files/minute, burst {burst or 'default'}.")
+    else:
+        print(f"User {username} not found.")
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 3:
+    if len(sys.argv) == 3 and sys.argv[1] == "--revoke":
+        revoke_user(sys.argv[2])
+    elif len(sys.argv) in (3, 4, 5) and sys.argv[1] == "--rate-limit":
+        set_rate_limit(
+            sys.argv[2],
+            float(sys.argv[3]) if len(sys.argv) > 3 else None,
+            int(sys.argv[4]) if len(sys.argv) > 4 else None,
+        )
+    elif len(sys.argv) != 3:
         print("Usage: python create_user.py <username> <password>")
+        print("       python create_user.py --revoke <username>")
+        print("       python create_user.py --rate-limit <username> [<files per minute> [<burst>]]")
     else:
         create_user(sys.argv[1], sys.argv[2])
@@ -1,13 +1,37 @@
 # app/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+def engine_options(url: str) -> dict:
+    """Connection pool settings; SQLite keeps SQLAlchemy's defaults, which suit a local file."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async handlers may use an async engine instead of a pool thread per query.
+# It exists only when DATABASE_ASYNC_URL names an async driver (e.g.
+# postgresql+asyncpg://...) whose package is installed.
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DATABASE_ASYNC_URL:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    async_engine = create_async_engine(settings.DATABASE_ASYNC_URL, **engine_options(settings.DATABASE_ASYNC_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     from sqlalchemy.orm import Session
     db = SessionLocal()
@@ -15,3 +39,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("DATABASE_ASYNC_URL is not configured.")
+    async with AsyncSessionLocal() as db:
+        yield db
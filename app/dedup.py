@@ -0,0 +1,94 @@
+# app/dedup.py
+
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+from . import database, models
+from .config import settings
+
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+def model_version() -> str:
+    """Identifies the transcription setup a cached result was produced with."""
+    return f"{settings.WHISPER_MODEL_SIZE}:{settings.WHISPER_COMPUTE_TYPE or 'auto'}"
+
+def _count(hit: bool) -> None:
+    global _hits, _misses
+    with _lock:
+        if hit:
+            _hits += 1
+        else:
+            _misses += 1
+
+def claim(tenant_id: int, content_hash: str, language: str, conversation_id: uuid.UUID) -> Optional[Tuple[uuid.UUID, Optional[uuid.UUID]]]:
+    """
+    Register an upload in the content index. Returns None if the content is
+    new (the caller now owns it), or the (conversation_id, job_id) of the
+    earlier upload it duplicates.
+    """
+    db = database.SessionLocal()
+    try:
+        key = dict(tenant_id=tenant_id, content_hash=content_hash, language=language, model_version=model_version())
+        existing = db.query(models.AudioFingerprint).filter_by(**key).first()
+        if existing is None:
+            db.add(models.AudioFingerprint(conversation_id=conversation_id, **key))
+            try:
+                db.commit()
+                _count(hit=False)
+                return None
+            except IntegrityError:
+                # A concurrent upload of the same content won the insert
+                db.rollback()
+                existing = db.query(models.AudioFingerprint).filter_by(**key).first()
+        _count(hit=True)
+        return existing.conversation_id, existing.job_id
+    finally:
+        db.close()
+
+def attach_job(conversation_id: uuid.UUID, job_id: str) -> None:
+    """Record the job processing a claimed upload, so duplicates can poll it."""
+    db = database.SessionLocal()
+    try:
+        db.query(models.AudioFingerprint).filter_by(conversation_id=conversation_id).update({"job_id": uuid.UUID(job_id)})
+        db.commit()
+    finally:
+        db.close()
+
+def attach_jobs(pairs: List[Tuple[uuid.UUID, str]]) -> None:
+    """`attach_job` for a whole upload batch, as one statement."""
+    if not pairs:
+        return
+    table = models.AudioFingerprint.__table__
+    statement = (
+        table.update()
+        .where(table.c.conversation_id == bindparam("b_conversation_id"))
+        .values(job_id=bindparam("b_job_id"))
+    )
+    db = database.SessionLocal()
+    try:
+        db.execute(statement, [{"b_conversation_id": conversation_id, "b_job_id": uuid.UUID(job_id)} for conversation_id, job_id in pairs])
+        db.commit()
+    finally:
+        db.close()
+
+def release(conversation_id: uuid.UUID) -> None:
+    """Forget an upload whose processing failed, so a retry is processed again."""
+    db = database.SessionLocal()
+    try:
+        db.query(models.AudioFingerprint).filter_by(conversation_id=conversation_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": round(_hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,61 @@
+# app/executors.py
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from .config import settings
+
+# Blocking work must never run on the event loop. IO-bound calls (files, DB,
+# queues, HTTP) go to the IO pool; CPU-heavy calls that release the GIL
+# (ffmpeg, CTranslate2) go to the smaller CPU pool. Password hashing has its
+# own pool so a login burst cannot starve other CPU work.
+_executors = {}
+_admission = {}
+
+class Saturated(Exception):
+    """Raised when a bounded pool already has its maximum of running plus queued calls."""
+
+def _pool_sizes():
+    return {
+        "io": (settings.IO_POOL_SIZE, None),
+        "cpu": (settings.CPU_POOL_SIZE, None),
+        "auth": (settings.AUTH_POOL_SIZE, settings.AUTH_QUEUE_LIMIT),
+    }
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Return the named bounded pool, creating it on first use."""
+    if name not in _executors:
+        size, queue_limit = _pool_sizes()[name]
+        _executors[name] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{name}-pool")
+        if queue_limit is not None:
+            _admission[name] = threading.BoundedSemaphore(size + queue_limit)
+    return _executors[name]
+
+async def run_in(name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `func` in the named pool and await its result; raises Saturated when the pool's queue is full."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor(name)
+    admission = _admission.get(name)
+    if admission is None:
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    if not admission.acquire(blocking=False):
+        raise Saturated(f"The {name} pool is saturated.")
+    try:
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    finally:
+        admission.release()
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await run_in("io", func, *args, **kwargs)
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await run_in("cpu", func, *args, **kwargs)
+
+def shutdown() -> None:
+    """Wait for queued work and release all pools."""
+    for executor in _executors.values():
+        executor.shutdown(wait=True)
+    _executors.clear()
+    _admission.clear()
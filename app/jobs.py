@@ -0,0 +1,557 @@
+# app/jobs.py
+
+import multiprocessing
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from queue import Empty
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from .config import settings
+from . import metrics, scheduler
+
+job_wait = metrics.histogram("job_wait_seconds", "Time jobs spend queued before a worker claims them, by tenant and priority")
+queue_depth = metrics.gauge("job_queue_depth", "Jobs waiting or running, by status")
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def new_record(job_id: str) -> Dict[str, Any]:
+    """Initial status record for a freshly enqueued job."""
+    from . import pipeline
+    now = datetime.utcnow()
+    return {
+        "job_id": job_id,
+        "status": QUEUED,
+        "stage": None,
+        "progress": 0.0,
+        "stages": {stage: "pending" for stage in pipeline.STAGES},
+        "conversation_id": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def advance(record: Dict[str, Any], stage: str) -> Dict[str, Any]:
+    """Mark `stage` as running and every earlier stage as done."""
+    from . import pipeline
+    stages = dict(record["stages"])
+    index = pipeline.STAGES.index(stage)
+    for done_stage in pipeline.STAGES[:index]:
+        stages[done_stage] = "done"
+    stages[stage] = "running"
+    record.update(
+        status=RUNNING,
+        stage=stage,
+        stages=stages,
+        progress=round(index / len(pipeline.STAGES), 3),
+        updated_at=datetime.utcnow(),
+    )
+    return record
+
+def finish(record: Dict[str, Any], result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """Mark a job as done (with its result) or failed (with the error)."""
+    stages = dict(record["stages"])
+    if error is None:
+        stages = {stage: "done" for stage in stages}
+        record.update(status=DONE, progress=1.0, conversation_id=(result or {}).get("conversation_id"))
+    else:
+        if record.get("stage"):
+            stages[record["stage"]] = "failed"
+        record.update(status=FAILED, error=error)
+    record.update(stages=stages, updated_at=datetime.utcnow())
+    return record
+
+def _release_fingerprint(conversation_id: str) -> None:
+    from . import dedup
+    try:
+        dedup.release(uuid.UUID(conversation_id))
+    except Exception as e:
+        logger.error(f"Failed to release dedup entry for {conversation_id}: {e}")
+
+def process_batch(batch: List[Tuple[str, Dict[str, Any]]], update_for: Callable[[str], Callable]) -> None:
+    """Run claimed jobs through the pipeline together, reporting each job's progress via `update_for(job_id)`."""
+    from . import pipeline
+    updates = [update_for(job_id) for job_id, _ in batch]
+    reports = [lambda stage, update=update: update(lambda record: advance(record, stage)) for update in updates]
+    try:
+        outcomes = pipeline.run_batch([payload for _, payload in batch], reports)
+    except Exception as e:
+        outcomes = [e] * len(batch)
+    for (job_id, payload), update, outcome in zip(batch, updates, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Job {job_id} failed: {outcome}")
+            _release_fingerprint(payload["conversation_id"])
+            update(lambda record, error=str(outcome): finish(record, error=error))
+        else:
+            logger.info(f"Job {job_id} finished.")
+            update(lambda record, result=outcome: finish(record, result=result))
+
+class JobQueue:
+    """Interface implemented by the job queue backends."""
+
+    def start(self) -> None:
+        """Start the workers owned by this queue."""
+
+    def stop(self) -> None:
+        """Stop the workers owned by this queue."""
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Persist a job and return its ID."""
+        raise NotImplementedError
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        """Persist several jobs together and return their IDs, in order."""
+        return [self.enqueue(payload) for payload in payloads]
+
+    async def enqueue_many_async(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        """`enqueue_many` for async handlers."""
+        from . import executors
+        return await executors.run_io(self.enqueue_many, payloads)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the status record of a job, or None if it is unknown."""
+        raise NotImplementedError
+
+    def ready(self) -> bool:
+        """Whether enqueued jobs will be picked up by a worker."""
+        return True
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per unfinished status."""
+        return {}
+
+    def waiting(self) -> Dict[Tuple[Optional[int], str], Dict[str, float]]:
+        """Waiting jobs and the age in seconds of the oldest, per (tenant_id, priority)."""
+        return {}
+
+# In-process backend
+
+def _age_seconds(timestamp: datetime) -> float:
+    now = datetime.now(timezone.utc) if timestamp.tzinfo else datetime.utcnow()
+    return max(0.0, (now - timestamp).total_seconds())
+
+def init_worker(ready=None) -> None:
+    """Per-process setup shared by all worker backends; counts the worker in `ready` once models are loaded."""
+    from . import logging_config, model_registry, tracing
+    logging_config.setup_logging()
+    tracing.setup("audio-transcription-worker")
+    model_registry.warm_up()
+    if ready is not None:
+        with ready.get_lock():
+            ready.value += 1
+
+def shutdown_worker() -> None:
+    """Release per-process resources started by the pipeline."""
+    from . import chunking
+    chunking.shutdown()
+    metrics.publish(force=True)
+
+def _run_lifecycle_if_due(next_run: float) -> float:
+    """Run a storage lifecycle pass if `next_run` (monotonic) has passed; returns when the next one is due."""
+    if settings.STORAGE_LIFECYCLE_INTERVAL <= 0 or time.monotonic() < next_run:
+        return next_run
+    from . import storage
+    try:
+        counts = storage.run_lifecycle()
+        if any(counts.values()):
+            logger.info(f"Storage lifecycle pass: {counts}")
+    except Exception as e:
+        logger.error(f"Storage lifecycle pass failed: {e}")
+    return time.monotonic() + settings.STORAGE_LIFECYCLE_INTERVAL
+
+def _retry_summaries_if_due(next_run: float) -> float:
+    """Retry pending summaries if `next_run` (monotonic) has passed; returns when the next retry is due."""
+    if time.monotonic() < next_run:
+        return next_run
+    # Idle workers backfill summaries that failed while the summarizer was unavailable
+    from . import pipeline
+    try:
+        completed = pipeline.retry_pending_summaries()
+        if completed:
+            logger.info(f"Completed {completed} pending summaries.")
+    except Exception as e:
+        logger.error(f"Retrying pending summaries failed: {e}")
+    return time.monotonic() + settings.SUMMARY_RETRY_INTERVAL
+
+def _inprocess_worker(queue, records, ready) -> None:
+    init_worker(ready)
+
+    def update_for(job_id):
+        def update(change):
+            records[job_id] = change(dict(records[job_id]))
+        return update
+
+    next_summary_retry = time.monotonic() + settings.SUMMARY_RETRY_INTERVAL
+    next_lifecycle = time.monotonic() + settings.STORAGE_LIFECYCLE_INTERVAL
+    while True:
+        # Block for one job, then gather more until the batch is full or the wait deadline passes
+        try:
+            item = queue.get(timeout=settings.METRICS_PUBLISH_INTERVAL)
+        except Empty:
+            next_summary_retry = _retry_summaries_if_due(next_summary_retry)
+            next_lifecycle = _run_lifecycle_if_due(next_lifecycle)
+            metrics.publish()
+            continue
+        if item is None:
+            break
+        batch = [item]
+        stopping = False
+        deadline = time.monotonic() + settings.TRANSCRIBE_BATCH_WAIT_MS / 1000
+        while len(batch) < settings.TRANSCRIBE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        for job_id, payload in batch:
+            job_wait.observe(_age_seconds(records[job_id]["created_at"]), **scheduler.labels(payload))
+        process_batch(batch, update_for)
+        metrics.publish()
+        if stopping:
+            break
+    shutdown_worker()
+
+class InProcessJobQueue(JobQueue):
+    """
+    Jobs held in memory and processed by a pool of local worker processes.
+    Jobs wait in a fair queue in this process; a dispatcher thread hands
+    them to the workers' queue only as far as the workers can take them, so
+    the fair order decides what runs next.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = None
+        self._records = None
+        self._queue = None
+        self._ready = self._context.Value("i", 0)
+        self._processes = []
+        self._pending = scheduler.FairQueue()
+        self._condition = threading.Condition()
+        self._dispatcher = None
+        self._stopping = False
+
+    def start(self) -> None:
+        self._manager = self._context.Manager()
+        self._records = self._manager.dict()
+        self._queue = self._context.Queue()
+        for _ in range(self.workers):
+            process_ = self._context.Process(target=_inprocess_worker, args=(self._queue, self._records, self._ready))
+            process_.start()
+            self._processes.append(process_)
+        self._stopping = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Started {self.workers} in-process job workers.")
+
+    def _dispatch(self) -> None:
+        # Enough jobs for every worker to fill a batch; the rest stay in fair order here
+        capacity = self.workers * settings.TRANSCRIBE_BATCH_SIZE
+        with self._condition:
+            while not self._stopping:
+                if self._pending and self._queue.qsize() < capacity:
+                    item, _, _ = self._pending.pop()
+                    self._queue.put(item)
+                else:
+                    # Woken by enqueue; polls for workers taking jobs off their queue
+                    self._condition.wait(timeout=0.05)
+
+    def stop(self) -> None:
+        if self._dispatcher is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._dispatcher.join()
+            self._dispatcher = None
+        for _ in self._processes:
+            self._queue.put(None)
+        for process_ in self._processes:
+            process_.join(timeout=30)
+            if process_.is_alive():
+                process_.terminate()
+        self._processes = []
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        if not self._processes:
+            raise RuntimeError("No job workers are running.")
+        job_id = str(uuid.uuid4())
+        self._records[job_id] = new_record(job_id)
+        tenant_id, priority = scheduler.job_key(payload)
+        cost = scheduler.job_cost(payload)
+        with self._condition:
+            self._pending.push((job_id, payload), tenant_id, priority, cost)
+            self._condition.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(job_id)
+        return dict(record) if record is not None else None
+
+    def ready(self) -> bool:
+        return self._ready.value > 0
+
+    def depth(self) -> Dict[str, int]:
+        if self._queue is None:
+            return {}
+        with self._condition:
+            return {QUEUED: len(self._pending) + self._queue.qsize()}
+
+    def waiting(self) -> Dict[Tuple[Optional[int], str], Dict[str, float]]:
+        # Jobs already handed to the workers' queue are not counted
+        with self._condition:
+            return self._pending.stats()
+
+# Database backend
+
+def _to_record(job) -> Dict[str, Any]:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "stages": job.stages or {},
+        "conversation_id": (job.result or {}).get("conversation_id"),
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+def _update_job(job_id: str, change) -> None:
+    from . import database, models
+    db = database.SessionLocal()
+    try:
+        job = db.query(models.Job).get(uuid.UUID(job_id))
+        record = change(_to_record(job))
+        job.status = record["status"]
+        job.stage = record["stage"]
+        job.progress = record["progress"]
+        job.stages = record["stages"]
+        job.error = record["error"]
+        if record["conversation_id"] is not None:
+            job.result = {"conversation_id": record["conversation_id"]}
+        db.commit()
+    finally:
+        db.close()
+
+def claim_jobs(limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Atomically move up to `limit` queued jobs to running, in priority and fair-queuing order."""
+    from . import database, models
+    db = database.SessionLocal()
+    try:
+        jobs = (
+            db.query(models.Job)
+            .filter(models.Job.status == QUEUED)
+            .order_by(models.Job.priority, models.Job.fair_start, models.Job.created_at)
+            .with_for_update(skip_locked=True)
+            .limit(limit)
+            .all()
+        )
+        for job in jobs:
+            job.status = RUNNING
+            job_wait.observe(_age_seconds(job.created_at), **scheduler.labels(job.payload))
+        claimed = [(str(job.id), job.payload) for job in jobs]
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+def run_database_worker(stop_event=None, ready=None) -> None:
+    """Poll the jobs table and process jobs until `stop_event` is set."""
+    init_worker(ready)
+
+    def update_for(job_id):
+        return lambda change: _update_job(job_id, change)
+
+    next_summary_retry = time.monotonic() + settings.SUMMARY_RETRY_INTERVAL
+    next_lifecycle = time.monotonic() + settings.STORAGE_LIFECYCLE_INTERVAL
+    while stop_event is None or not stop_event.is_set():
+        batch = claim_jobs(settings.TRANSCRIBE_BATCH_SIZE)
+        if not batch:
+            next_summary_retry = _retry_summaries_if_due(next_summary_retry)
+            next_lifecycle = _run_lifecycle_if_due(next_lifecycle)
+            metrics.publish()
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        if len(batch) < settings.TRANSCRIBE_BATCH_SIZE and settings.TRANSCRIBE_BATCH_WAIT_MS:
+            time.sleep(settings.TRANSCRIBE_BATCH_WAIT_MS / 1000)
+            batch += claim_jobs(settings.TRANSCRIBE_BATCH_SIZE - len(batch))
+        process_batch(batch, update_for)
+        metrics.publish()
+    shutdown_worker()
+
+def _tag_queries(payloads: List[Dict[str, Any]]):
+    """Queries for the virtual time of each priority class and the last finish tag of the payloads' tenants."""
+    from sqlalchemy import func, select
+    from . import models
+    job = models.Job
+    tenants = {scheduler.job_key(payload)[0] for payload in payloads}
+    virtual = select(job.priority, func.min(job.fair_start)).where(job.status == QUEUED).group_by(job.priority)
+    finish = (
+        select(job.tenant_id, job.priority, func.max(job.fair_finish))
+        .where(job.status == QUEUED, job.tenant_id.in_(tenants))
+        .group_by(job.tenant_id, job.priority)
+    )
+    return virtual, finish
+
+def _job_rows(payloads: List[Dict[str, Any]], virtual, finish) -> List[Dict[str, Any]]:
+    """Rows of new jobs, tagged from the results of the `_tag_queries`."""
+    keys = [scheduler.job_key(payload) for payload in payloads]
+    tags = scheduler.assign_tags(
+        [(tenant_id, scheduler.rank(priority), scheduler.job_cost(payload)) for (tenant_id, priority), payload in zip(keys, payloads)],
+        dict(virtual.all()),
+        {(tenant_id, job_rank): tag for tenant_id, job_rank, tag in finish.all()},
+        scheduler.parse_weights(settings.SCHEDULER_TENANT_WEIGHTS),
+    )
+    rows = []
+    for payload, (tenant_id, priority), (start, end) in zip(payloads, keys, tags):
+        job_id = uuid.uuid4()
+        record = new_record(str(job_id))
+        rows.append({
+            "id": job_id,
+            "status": QUEUED,
+            "tenant_id": tenant_id,
+            "priority": scheduler.rank(priority),
+            "fair_start": start,
+            "fair_finish": end,
+            "progress": 0.0,
+            "stages": record["stages"],
+            "payload": payload,
+            "created_at": record["created_at"],
+            "updated_at": record["updated_at"],
+        })
+    return rows
+
+class DatabaseJobQueue(JobQueue):
+    """Jobs persisted in the `jobs` table, claimed with SKIP LOCKED by any number of workers."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = None
+        self._ready = self._context.Value("i", 0)
+        self._processes = []
+
+    def start(self) -> None:
+        self._stop_event = self._context.Event()
+        for _ in range(self.workers):
+            process_ = self._context.Process(target=run_database_worker, args=(self._stop_event, self._ready))
+            process_.start()
+            self._processes.append(process_)
+        logger.info(f"Started {self.workers} database job workers.")
+
+    def stop(self) -> None:
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for process_ in self._processes:
+            process_.join(timeout=30)
+            if process_.is_alive():
+                process_.terminate()
+        self._processes = []
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        return self.enqueue_many([payload])[0]
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        # One multi-row INSERT and one commit for the whole upload batch
+        from sqlalchemy import insert
+        from . import database, models
+        virtual, finish = _tag_queries(payloads)
+        db = database.SessionLocal()
+        try:
+            rows = _job_rows(payloads, db.execute(virtual), db.execute(finish))
+            db.execute(insert(models.Job), rows)
+            db.commit()
+        finally:
+            db.close()
+        return [str(row["id"]) for row in rows]
+
+    async def enqueue_many_async(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        from sqlalchemy import insert
+        from . import database, models
+        if database.AsyncSessionLocal is None:
+            return await super().enqueue_many_async(payloads)
+        virtual, finish = _tag_queries(payloads)
+        async with database.AsyncSessionLocal() as db:
+            rows = _job_rows(payloads, await db.execute(virtual), await db.execute(finish))
+            await db.execute(insert(models.Job), rows)
+            await db.commit()
+        return [str(row["id"]) for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        from . import database, models
+        db = database.SessionLocal()
+        try:
+            job = db.query(models.Job).get(uuid.UUID(job_id))
+            return _to_record(job) if job is not None else None
+        finally:
+            db.close()
+
+    def ready(self) -> bool:
+        # Without local workers, jobs are served by external `app.worker` processes
+        return self.workers == 0 or self._ready.value > 0
+
+    def depth(self) -> Dict[str, int]:
+        from sqlalchemy import func
+        from . import database, models
+        db = database.SessionLocal()
+        try:
+            rows = (
+                db.query(models.Job.status, func.count())
+                .filter(models.Job.status.in_([QUEUED, RUNNING]))
+                .group_by(models.Job.status)
+                .all()
+            )
+            return {QUEUED: 0, RUNNING: 0, **dict(rows)}
+        finally:
+            db.close()
+
+    def waiting(self) -> Dict[Tuple[Optional[int], str], Dict[str, float]]:
+        from sqlalchemy import func
+        from . import database, models
+        db = database.SessionLocal()
+        try:
+            rows = (
+                db.query(models.Job.tenant_id, models.Job.priority, func.count(), func.min(models.Job.created_at))
+                .filter(models.Job.status == QUEUED)
+                .group_by(models.Job.tenant_id, models.Job.priority)
+                .all()
+            )
+            return {
+                (tenant_id, scheduler.PRIORITIES[job_rank]): {"jobs": count, "oldest_seconds": _age_seconds(oldest)}
+                for tenant_id, job_rank, count, oldest in rows
+            }
+        finally:
+            db.close()
+
+_BACKENDS = {
+    "inprocess": InProcessJobQueue,
+    "database": DatabaseJobQueue,
+}
+
+def create_job_queue() -> JobQueue:
+    """Build the job queue selected by `settings.JOB_BACKEND`."""
+    try:
+        backend = _BACKENDS[settings.JOB_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown job backend: {settings.JOB_BACKEND}")
+    # API-only processes never start workers, so they never import torch/whisperx
+    if settings.APP_ROLE == "api" and backend is InProcessJobQueue:
+        raise ValueError("APP_ROLE=api needs JOB_BACKEND=database: in-process jobs can only run in the API process's own workers")
+    # Fail at startup rather than at the first enqueue
+    scheduler.parse_weights(settings.SCHEDULER_TENANT_WEIGHTS)
+    workers = 0 if settings.APP_ROLE == "api" else settings.JOB_WORKERS
+    return backend(workers)
@@ -3,6 +3,7 @@
 from loguru import logger
 from .config import settings
 import sys
+from typing import Any, Optional
 
 def setup_logging():
     logger.remove()  # Remove the default logger
@@ -11,3 +12,9 @@ def setup_logging():
         logger.add("app.log", rotation="10 MB", level="INFO")
     else:
         logger.add(sys.stdout, level="WARNING")
+
+def preview(value: Any, limit: Optional[int] = None) -> str:
+    """String form of a log payload, cut to LOG_PAYLOAD_MAX_CHARS. Pass it lazily: `logger.opt(lazy=True)`."""
+    limit = limit or settings.LOG_PAYLOAD_MAX_CHARS
+    text = str(value)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
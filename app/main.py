@@ -1,18 +1,26 @@
 # app/main.py
 
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import and_, or_, text
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
-from . import models, schemas, auth, database, transcription, utils, logging_config
+from . import models, schemas, auth, database, dedup, executors, jobs, metrics, pipeline, scheduler, search, storage, streaming, tracing, transcripts, utils, logging_config
 from .config import settings
+import asyncio
+import hashlib
+import json
+import math
 import os
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Initialize logging
 logging_config.setup_logging()
+tracing.setup("audio-transcription-api")
 
 app = FastAPI(
     title="Audio Transcription API",
@@ -20,12 +28,54 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Create database tables
-models.Base.metadata.create_all(bind=database.engine)
+# Schema is managed by Alembic migrations (`alembic upgrade head`)
+if settings.AUTO_CREATE_TABLES:
+    models.Base.metadata.create_all(bind=database.engine)
+
+# Background transcription jobs
+job_queue = jobs.create_job_queue()
+
+# Live streams transcribe in this process; each holds a bounded window of audio
+active_streams = 0
+
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.start()
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    job_queue.stop()
+    executors.shutdown()
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversize uploads from the Content-Length header, before the multipart body is read
+    if request.url.path == "/upload-audio":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_REQUEST_MB * 2**20:
+            logger.warning(f"Rejected upload of {content_length} bytes.")
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": f"Upload exceeds the {settings.MAX_UPLOAD_REQUEST_MB} MB limit."},
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with tracing.span(f"{request.method} {request.url.path}", method=request.method, path=request.url.path):
+        return await call_next(request)
 
 @app.post("/token", tags=["Authentication"])
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    try:
+        user = await auth.authenticate_user_async(db, form_data.username, form_data.password)
+    except executors.Saturated:
+        logger.warning("Password verification pool is saturated; rejecting login.")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent logins, retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         logger.warning(f"Authentication failed for user: {form_data.username}")
         raise HTTPException(
@@ -33,7 +83,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    access_token = auth.create_access_token(data=auth.token_claims(user))
     logger.info(f"User {user.username} authenticated successfully.")
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -50,15 +100,30 @@ async def upload_audio(
     representative_name: str = Form(...),
     call_type: str = Form("inbound"),
     audio_file_language: str = Form(..., description="Language of the audio, e.g., 'he' for Hebrew"),
+    priority: str = Form(scheduler.DEFAULT_PRIORITY, description="'live' for recent calls, 'backfill' for bulk imports, which wait while live calls are queued"),
     db: Session = Depends(database.get_db),
-    current_user: models.APIKey = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     if len(files) > 10:
         logger.error("Bulk upload exceeds 10 files.")
         raise HTTPException(status_code=400, detail="Cannot upload more than 10 files at once.")
-    
-    responses = []
-    for file in files:
+    try:
+        scheduler.rank(priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    retry_after = scheduler.rate_limiter.acquire(current_user, len(files))
+    if retry_after:
+        logger.warning(f"Rate limited upload of {len(files)} files by {current_user.username}.")
+        if math.isinf(retry_after):
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Upload exceeds the rate limit burst size.")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Upload rate limit exceeded.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    async def prepare_file(file: UploadFile):
+        """Convert one file; returns its (conversation_id, job payload), or the response if it needs no job."""
         try:
             # Extract metadata
             metadata = {
@@ -76,94 +141,346 @@ async def upload_audio(
             # Generate file path
             extension = file.filename.split(".")[-1]
             uniform_extension = "wav"  # Convert all files to WAV
-            file_path = utils.generate_file_path(metadata, uniform_extension)
-
-            # Save the original file temporarily
-            temp_path = f"/tmp/{uuid.uuid4()}.{extension}"
-            with open(temp_path, "wb") as buffer:
-                buffer.write(await file.read())
-            logger.debug(f"Saved temporary file at {temp_path}")
-
-            # Convert audio to uniform format
-            utils.convert_audio(temp_path, file_path)
-            logger.info(f"Converted and saved file at {file_path}")
-
-            # Remove temporary file
-            os.remove(temp_path)
-
-            # Transcribe audio
-            transcript_data = transcription.transcribe_audio(file_path, language=audio_file_language)
-            logger.debug(f"Transcribed audio: {transcript_data}")
-
-            # Summarize transcript using Gemini API
-            full_transcript = " ".join([segment['text'] for segment in transcript_data['transcript']])
-            summary = transcription.summarize_transcript(full_transcript)
-            logger.debug(f"Summarized transcript: {summary}")
-
-            # Save to database
-            conversation = models.Conversation(
-                tenant_id=metadata["tenant_id"],
-                conversation_id=uuid.uuid4(),
-                insent_timestamp=metadata["insent_timestamp"],
-                call_id=metadata["call_id"],
-                callee_phone_number=metadata["callee_phone_number"],
-                caller_phone_number=metadata["caller_phone_number"],
-                call_start_timestamp=metadata["call_start_timestamp"],
-                call_end_timestamp=metadata["call_end_timestamp"],
-                call_duration=int((metadata["call_end_timestamp"] - metadata["call_start_timestamp"]).total_seconds()),
-                customer_id=None,  # Populate as needed
-                customer_details=None,  # Populate as needed
-                call_project_id=None,  # Populate as needed
-                call_project_details=None,  # Populate as needed
-                crm_date=None,  # Populate as needed
-                representative_id=metadata["representative_id"],
-                representative_name=representative_name,
-                representative_details=None,  # Populate as needed
-                conversation_transcript=transcript_data,
-                conversation_summary=summary,  # Assigning summary here
-                tags=None,  # Populate as needed
-                sentiment=None,  # Populate as needed
-                resolution_status=None,  # Populate as needed
-                audio_file_id=file_path,
-                audio_file_details=None,  # Populate as needed
-                language=audio_file_language,
-                analytics=None  # Populate as needed
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-            logger.info(f"Saved conversation {conversation.conversation_id} to database.")
-
-            responses.append(schemas.AudioUploadResponse(
-                success=True,
-                details="File processed successfully.",
-                conversation_id=str(conversation.conversation_id)
-            ))
+            file_path = await executors.run_io(utils.generate_file_path, metadata, uniform_extension)
+
+            # Stream the upload through ffmpeg into the uniform format, hashing it on the way.
+            # Each upload is read once; the price is that a duplicate is only recognised after its conversion.
+            digest = hashlib.sha256()
+            with tracing.stage("convert", filename=file.filename):
+                received = await utils.stream_convert_audio(file, extension, file_path, digest)
+            logger.info(f"Converted {received} bytes and saved file at {file_path}")
+
+            # Retried uploads of the same recording link to the existing conversation
+            conversation_id = uuid.uuid4()
+            try:
+                duplicate = await executors.run_io(dedup.claim, tenant_id, digest.hexdigest(), audio_file_language, conversation_id)
+            except Exception:
+                await executors.run_io(os.remove, file_path)
+                raise
+            if duplicate is not None:
+                await executors.run_io(os.remove, file_path)
+                existing_conversation_id, existing_job_id = duplicate
+                logger.info(f"File {file.filename} duplicates conversation {existing_conversation_id}.")
+                return schemas.AudioUploadResponse(
+                    success=True,
+                    details="Duplicate of a previously uploaded file.",
+                    conversation_id=existing_conversation_id,
+                    job_id=existing_job_id
+                )
+
+            # Transcription, summarization and storage are queued with the rest of the batch
+            return conversation_id, {
+                "conversation_id": str(conversation_id),
+                "file_path": file_path,
+                "language": audio_file_language,
+                "representative_name": representative_name,
+                "priority": priority,
+                "metadata": pipeline.serialize_metadata(metadata),
+                "trace": tracing.carrier(),
+            }
         except Exception as e:
             logger.error(f"Failed to process file {file.filename}: {e}")
-            responses.append(schemas.AudioUploadResponse(
+            return schemas.AudioUploadResponse(
                 success=False,
                 details=str(e)
-            ))
+            )
+
+    # Files within one batch are saved concurrently, then queued in one transaction
+    responses = list(await asyncio.gather(*(prepare_file(file) for file in files)))
+    queued = [index for index, response in enumerate(responses) if isinstance(response, tuple)]
+    if queued:
+        conversation_ids = [responses[index][0] for index in queued]
+        try:
+            job_ids = await job_queue.enqueue_many_async([responses[index][1] for index in queued])
+        except Exception as e:
+            logger.error(f"Failed to queue {len(queued)} files: {e}")
+            for index, conversation_id in zip(queued, conversation_ids):
+                await executors.run_io(dedup.release, conversation_id)
+                responses[index] = schemas.AudioUploadResponse(success=False, details=str(e))
+        else:
+            try:
+                await executors.run_io(dedup.attach_jobs, list(zip(conversation_ids, job_ids)))
+            except Exception as e:
+                # The jobs run regardless; duplicates of these files just cannot poll them
+                logger.error(f"Failed to link {len(job_ids)} jobs to their uploads: {e}")
+            for index, conversation_id, job_id in zip(queued, conversation_ids, job_ids):
+                logger.info(f"Queued job {job_id} for file {files[index].filename}.")
+                responses[index] = schemas.AudioUploadResponse(
+                    success=True,
+                    details="File queued for processing.",
+                    conversation_id=conversation_id,
+                    job_id=job_id
+                )
     return responses
 
+@app.websocket("/stream-audio")
+async def stream_audio(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Live transcription. After the connection opens the client sends a
+    StreamStart JSON message, then binary audio frames, then {"type": "stop"}.
+    The server replies with StreamSegments messages ("partial" while text
+    may still change, "final" once it is stable) and, after the last audio,
+    StreamSaved with the conversation the recording is being stored as.
+    Streams need a model in this process, so APP_ROLE=api replicas refuse them.
+    """
+    global active_streams
+    if settings.APP_ROLE == "api":
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    authorization = websocket.headers.get("authorization", "")
+    token = token or (authorization[7:] if authorization.lower().startswith("bearer ") else None)
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        current_user = await auth.get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Checked and taken without awaiting in between, so concurrent streams cannot all pass the check
+    if active_streams >= settings.STREAM_MAX_SESSIONS:
+        logger.warning("Rejected live stream: all stream slots are in use.")
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    active_streams += 1
+
+    try:
+        await websocket.accept()
+        try:
+            start = schemas.StreamStart.parse_raw(await websocket.receive_text())
+            metadata = {
+                "tenant_id": start.tenant_id,
+                "insent_timestamp": start.insent_timestamp or datetime.utcnow(),
+                "call_start_timestamp": start.call_start_timestamp or datetime.utcnow(),
+                "caller_phone_number": start.caller_phone_number,
+                "callee_phone_number": start.callee_phone_number,
+                "call_id": str(uuid.uuid4()),
+                "representative_id": start.representative_id,
+                "call_type": start.call_type
+            }
+            file_path = await executors.run_io(utils.generate_file_path, metadata, "wav")
+            session = streaming.StreamSession(start, file_path)
+        except (ValueError, WebSocketDisconnect) as e:
+            logger.warning(f"Rejected live stream from {current_user.username}: {e}")
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+            return
+
+        connected = True
+        receiving = True
+
+        async def send(message) -> None:
+            nonlocal connected
+            if connected:
+                try:
+                    await websocket.send_text(message.json())
+                except Exception:
+                    connected = False
+
+        async def transcribe_live() -> None:
+            # Passes run back to back while new audio keeps arriving; a slow pass just makes the next one cover more
+            while receiving:
+                await session.audio_arrived.wait()
+                session.audio_arrived.clear()
+                if not session.window.due():
+                    continue
+                finals, partials = await session.transcribe()
+                if finals:
+                    await send(schemas.StreamSegments(type="final", segments=streaming.to_transcript_segments(finals)))
+                await send(schemas.StreamSegments(type="partial", segments=streaming.to_transcript_segments(partials)))
+
+        finish_error = None
+        await session.open()
+        logger.info(f"Live stream from {current_user.username} recording to {file_path}")
+        transcriber = asyncio.ensure_future(transcribe_live())
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    connected = False
+                    break
+                if message.get("bytes"):
+                    await session.write(message["bytes"])
+                elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                    break
+        except Exception as e:
+            if session.error is None:
+                logger.error(f"Live stream from {current_user.username} failed: {e}")
+        finally:
+            receiving = False
+            session.audio_arrived.set()
+            try:
+                await session.finish()
+            except Exception as e:
+                finish_error = e
+            finish_error = session.error or finish_error
+            try:
+                await transcriber
+            except Exception as e:
+                logger.error(f"Live transcription failed: {e}")
+
+        if finish_error is not None:
+            # The recording may be cut short or corrupt; the client is told instead of it being queued
+            logger.error(f"Live stream from {current_user.username} could not be completed: {finish_error}")
+            await executors.run_io(os.remove, file_path)
+            if connected:
+                too_large = isinstance(finish_error, utils.UploadTooLarge)
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG if too_large else status.WS_1011_INTERNAL_ERROR)
+            return
+
+        if session.recorded == 0:
+            await executors.run_io(os.remove, file_path)
+            if connected:
+                await websocket.close()
+            return
+
+        try:
+            if connected:
+                finals, _ = await session.transcribe(final=True)
+                await send(schemas.StreamSegments(type="final", segments=streaming.to_transcript_segments(finals)))
+        except Exception as e:
+            logger.error(f"Final live transcription pass failed: {e}")
+
+        # The recording goes through the batch pipeline, as an upload of it would
+        metadata["call_end_timestamp"] = metadata["call_start_timestamp"] + timedelta(seconds=session.duration)
+        conversation_id = uuid.uuid4()
+        job_id = await executors.run_io(job_queue.enqueue, {
+            "conversation_id": str(conversation_id),
+            "file_path": file_path,
+            "language": start.language,
+            "representative_name": start.representative_name,
+            "priority": "live",
+            "metadata": pipeline.serialize_metadata(metadata),
+            "trace": tracing.carrier(),
+        })
+        logger.info(f"Queued job {job_id} for live stream recorded at {file_path}.")
+        await send(schemas.StreamSaved(conversation_id=conversation_id, job_id=job_id))
+        if connected:
+            await websocket.close()
+    finally:
+        active_streams -= 1
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatus, tags=["Audio"])
+def get_job(
+    job_id: uuid.UUID,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Retrieve the status and per-stage progress of a transcription job.
+    """
+    record = job_queue.get(str(job_id))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return schemas.JobStatus(**record)
+
+@app.get("/ready", tags=["Health"])
+def ready():
+    """
+    Readiness probe: the database is reachable and queued jobs will be processed.
+    """
+    checks = {"database": True, "workers": job_queue.ready()}
+    try:
+        with database.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Readiness check failed to reach the database: {e}")
+        checks["database"] = False
+    if not all(checks.values()):
+        raise HTTPException(status_code=503, detail={"role": settings.APP_ROLE, "checks": checks})
+    return {"ready": True, "role": settings.APP_ROLE, "checks": checks}
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """
+    Prometheus metrics of the API process and its job workers: stage timings,
+    real-time factor, queue depth and wait (overall and per tenant), model
+    cache and summarizer stats.
+    """
+    try:
+        for job_status, count in (await executors.run_io(job_queue.depth)).items():
+            jobs.queue_depth.set(count, status=job_status)
+        waiting = await executors.run_io(job_queue.waiting)
+        # Tenants whose queue drained drop out instead of keeping their last value
+        scheduler.queue_depth.clear()
+        scheduler.oldest_wait.clear()
+        for (tenant_id, priority), entry in waiting.items():
+            scheduler.queue_depth.set(entry["jobs"], tenant=tenant_id, priority=priority)
+            scheduler.oldest_wait.set(entry["oldest_seconds"], tenant=tenant_id, priority=priority)
+    except Exception as e:
+        logger.warning(f"Failed to read job queue depth: {e}")
+    return PlainTextResponse(await executors.run_io(metrics.render), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats", tags=["Health"])
+def get_stats(current_user: auth.Principal = Depends(auth.get_current_user)):
+    """
+    Counters of this API process, such as the upload dedup hit rate.
+    """
+    return {
+        "dedup": dedup.stats(),
+        "principal_cache": auth.principal_cache.stats(),
+        "credential_cache": auth.credential_cache.stats(),
+        "metrics": metrics.snapshot(),
+    }
+
 # New Endpoint: Retrieve Conversations
 
-@app.get("/conversations", response_model=schemas.ConversationsListResponse, tags=["Conversations"])
+# Columns returned when `fields` is not given; the transcript is only loaded on request
+DEFAULT_CONVERSATION_FIELDS = [name for name in schemas.ConversationMetadata.__fields__ if name != "conversation_transcript"]
+
+def conversation_row(row, fields: List[str]) -> dict:
+    # Compact transcripts are expanded here, only for rows that asked for them
+    return {name: transcripts.load(row) if name == "conversation_transcript" else getattr(row, name) for name in fields}
+
+def stream_conversations(query, fields: List[str], limit: int, db: Session):
+    """Yield a ConversationsPageResponse as JSON text, one row at a time."""
+    try:
+        yield '{"conversations": ['
+        last = None
+        for count, row in enumerate(query.yield_per(500)):
+            yield ("," if count else "") + json.dumps(jsonable_encoder(conversation_row(row, fields)))
+            last = row
+        next_cursor = utils.encode_cursor(last.call_start_timestamp, last.id) if last is not None and count + 1 == limit else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + "}"
+    finally:
+        db.close()
+
+@app.get("/conversations", response_model=schemas.ConversationsPageResponse, tags=["Conversations"])
 def get_conversations(
     tenant_id: Optional[int] = Query(None, description="Filter by Tenant ID"),
     conversation_id: Optional[uuid.UUID] = Query(None, description="Filter by Conversation ID"),
     representative_id: Optional[str] = Query(None, description="Filter by Representative ID"),
     start_date: Optional[datetime] = Query(None, description="Filter by start date"),
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return; the transcript is excluded by default"),
+    limit: int = Query(settings.CONVERSATIONS_PAGE_SIZE, ge=1, le=settings.CONVERSATIONS_MAX_PAGE_SIZE, description="Maximum conversations per page"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
     db: Session = Depends(database.get_db),
-    current_user: models.APIKey = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
-    Retrieve conversations from the database with optional filters.
+    Retrieve conversations from the database with optional filters, newest
+    first, paginated by a (call_start_timestamp, id) cursor.
     """
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in schemas.ConversationMetadata.__fields__]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        selected = DEFAULT_CONVERSATION_FIELDS
+    if cursor is not None:
+        try:
+            cursor_timestamp, cursor_id = utils.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
-        query = db.query(models.Conversation)
+        # Only the requested columns are loaded, plus the cursor key
+        columns = {name: getattr(models.Conversation, name) for name in selected}
+        columns.setdefault("call_start_timestamp", models.Conversation.call_start_timestamp)
+        if "conversation_transcript" in columns:
+            columns["transcript_encoded"] = models.Conversation.transcript_encoded
+            columns["transcript_version"] = models.Conversation.transcript_version
+        columns["id"] = models.Conversation.id
+        query = db.query(*columns.values())
 
         if tenant_id is not None:
             query = query.filter(models.Conversation.tenant_id == tenant_id)
@@ -175,43 +492,146 @@ def get_conversations(
             query = query.filter(models.Conversation.call_start_timestamp >= start_date)
         if end_date is not None:
             query = query.filter(models.Conversation.call_end_timestamp <= end_date)
+            # Implied by the filter above (calls end after they start); bounds the index range scan
+            query = query.filter(models.Conversation.call_start_timestamp <= end_date)
+        if cursor is not None:
+            query = query.filter(or_(
+                models.Conversation.call_start_timestamp < cursor_timestamp,
+                and_(models.Conversation.call_start_timestamp == cursor_timestamp, models.Conversation.id < cursor_id),
+            ))
+
+        query = query.order_by(models.Conversation.call_start_timestamp.desc(), models.Conversation.id.desc()).limit(limit)
 
-        conversations = query.all()
-
-        response = schemas.ConversationsListResponse(
-            conversations=[
-                schemas.ConversationMetadata(
-                    tenant_id=conv.tenant_id,
-                    conversation_id=conv.conversation_id,
-                    insent_timestamp=conv.insent_timestamp,
-                    call_id=conv.call_id,
-                    callee_phone_number=conv.callee_phone_number,
-                    caller_phone_number=conv.caller_phone_number,
-                    call_start_timestamp=conv.call_start_timestamp,
-                    call_end_timestamp=conv.call_end_timestamp,
-                    call_duration=conv.call_duration,
-                    customer_id=conv.customer_id,
-                    customer_details=conv.customer_details,
-                    call_project_id=conv.call_project_id,
-                    call_project_details=conv.call_project_details,
-                    crm_date=conv.crm_date,
-                    representative_id=conv.representative_id,
-                    representative_name=conv.representative_name,
-                    representative_details=conv.representative_details,
-                    conversation_transcript=conv.conversation_transcript,
-                    conversation_summary=conv.conversation_summary,
-                    tags=conv.tags,
-                    sentiment=conv.sentiment,
-                    resolution_status=conv.resolution_status,
-                    audio_file_id=conv.audio_file_id,
-                    audio_file_details=conv.audio_file_details,
-                    language=conv.language,
-                    analytics=conv.analytics
-                ) for conv in conversations
-            ]
+        if limit > settings.CONVERSATIONS_STREAM_THRESHOLD:
+            # Large pages are streamed from a dedicated session instead of being built in memory
+            stream_db = database.SessionLocal()
+            logger.info(f"Streaming up to {limit} conversations.")
+            return StreamingResponse(
+                stream_conversations(query.with_session(stream_db), selected, limit, stream_db),
+                media_type="application/json",
+            )
+
+        rows = query.all()
+        next_cursor = utils.encode_cursor(rows[-1].call_start_timestamp, rows[-1].id) if len(rows) == limit else None
+        logger.info(f"Retrieved {len(rows)} conversations from the database.")
+        return schemas.ConversationsPageResponse(
+            conversations=[conversation_row(row, selected) for row in rows],
+            next_cursor=next_cursor
         )
-        logger.info(f"Retrieved {len(conversations)} conversations from the database.")
-        return response
     except Exception as e:
         logger.error(f"Failed to retrieve conversations: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/conversations/search", response_model=schemas.SearchResponse, tags=["Conversations"])
+def search_conversations(
+    q: str = Query(..., min_length=1, description="Words or phrase to find in transcripts"),
+    tenant_id: Optional[int] = Query(None, description="Filter by Tenant ID"),
+    start_date: Optional[datetime] = Query(None, description="Filter by call start, from"),
+    end_date: Optional[datetime] = Query(None, description="Filter by call start, until"),
+    phrase: bool = Query(True, description="Match the words consecutively; false matches them anywhere in a segment"),
+    limit: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE, description="Maximum hits per page"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Find transcript segments containing `q`, newest call first, with the
+    speaker and timestamp of each hit. A page may hold fewer than `limit`
+    hits when many candidates had to be checked; follow `next_cursor` until
+    it is null.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = utils.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        hits, after = search.search(db, q, tenant_id, start_date, end_date, phrase, limit, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Search returned {len(hits)} hits.")
+    return schemas.SearchResponse(
+        hits=[schemas.SearchHit(**{name: getattr(hit, name) for name in schemas.SearchHit.__fields__}) for hit in hits],
+        next_cursor=utils.encode_cursor(*after) if after is not None else None,
+    )
+
+@app.get("/conversations/{conversation_id}/transcript", response_model=schemas.Transcript, tags=["Conversations"])
+def get_conversation_transcript(
+    conversation_id: uuid.UUID,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Retrieve the full transcript of one conversation.
+    """
+    row = (
+        db.query(
+            models.Conversation.conversation_transcript,
+            models.Conversation.transcript_encoded,
+            models.Conversation.transcript_version,
+        )
+        .filter(models.Conversation.conversation_id == conversation_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return transcripts.load(row)
+
+@app.get("/conversations/{conversation_id}/audio", tags=["Conversations"])
+def get_conversation_audio(
+    conversation_id: uuid.UUID,
+    request: Request,
+    start: Optional[float] = Query(None, ge=0, description="Play from this many seconds into the call"),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Stream the recording of one conversation. Honors a single-range `Range`
+    header; with `start`, the stream begins at the seek point at or before
+    that time, after the codec headers.
+    """
+    row = (
+        db.query(models.Conversation.audio_file_id, models.Conversation.audio_file_details)
+        .filter(models.Conversation.conversation_id == conversation_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    try:
+        backend, key, details = storage.locate(row.audio_file_id, row.audio_file_details)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    size = backend.size(key)
+    if size is None:
+        raise HTTPException(status_code=404, detail="The recording is not available.")
+    headers = {"Accept-Ranges": "bytes"}
+
+    if start is not None and "data_offset" in details:
+        # Codec headers, then the audio from the seek point
+        offset = storage.seek_offset(details, start)
+        def body():
+            yield from backend.read(key, 0, details["data_offset"])
+            yield from backend.read(key, offset, size)
+        headers["Content-Length"] = str(details["data_offset"] + size - offset)
+        return StreamingResponse(body(), media_type=details["media_type"], headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(backend.read(key), media_type=details["media_type"], headers=headers)
+    try:
+        first, end = utils.parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Invalid range",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    headers.update({"Content-Range": f"bytes {first}-{end - 1}/{size}", "Content-Length": str(end - first)})
+    return StreamingResponse(
+        backend.read(key, first, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=details["media_type"],
+        headers=headers,
+    )
@@ -0,0 +1,239 @@
+# app/metrics.py
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from loguru import logger
+from .config import settings
+
+# Latency buckets in seconds, from fast cache hits to multi-minute transcriptions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, Any] = {}
+
+    def samples(self) -> Dict[LabelKey, Any]:
+        with self._lock:
+            return {key: (dict(value) if isinstance(value, dict) else value) for key, value in self._values.items()}
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def clear(self) -> None:
+        """Drop all label sets, e.g. before refreshing a gauge whose labels come and go."""
+        with self._lock:
+            self._values.clear()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets)}
+            entry["count"] += 1
+            entry["sum"] += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+
+    def samples(self) -> Dict[LabelKey, Any]:
+        with self._lock:
+            return {key: {"count": v["count"], "sum": v["sum"], "buckets": list(v["buckets"])} for key, v in self._values.items()}
+
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+def _get_or_create(cls, name: str, description: str, **kwargs) -> Metric:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, description, **kwargs)
+        return metric
+
+def counter(name: str, description: str) -> Counter:
+    return _get_or_create(Counter, name, description)
+
+def gauge(name: str, description: str) -> Gauge:
+    return _get_or_create(Gauge, name, description)
+
+def histogram(name: str, description: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, description, buckets=buckets)
+
+_collectors: List[Callable[[], None]] = []
+_last_publish = 0.0
+
+def register_collector(func: Callable[[], None]) -> Callable[[], None]:
+    """Register a function that refreshes gauges from other state just before metrics are read."""
+    _collectors.append(func)
+    return func
+
+def _collect() -> None:
+    for func in list(_collectors):
+        try:
+            func()
+        except Exception as e:
+            logger.warning(f"Metrics collector {func.__name__} failed: {e}")
+
+def _export() -> List[Dict[str, Any]]:
+    _collect()
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return [
+        {
+            "name": metric.name,
+            "kind": metric.kind,
+            "description": metric.description,
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": [[list(key), value] for key, value in metric.samples().items()],
+        }
+        for metric in metrics
+    ]
+
+# Job workers run in their own processes. Each one periodically writes its
+# metrics to METRICS_DIR, and the API process merges those files into its
+# /metrics output: counters and histograms are summed, gauges keep a pid label.
+
+def publish(force: bool = False) -> None:
+    """Write this process's metrics to METRICS_DIR, at most every METRICS_PUBLISH_INTERVAL seconds."""
+    global _last_publish
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_publish < settings.METRICS_PUBLISH_INTERVAL:
+        return
+    _last_publish = now
+    try:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(_export(), f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        logger.warning(f"Failed to publish metrics: {e}")
+
+def _published() -> List[Tuple[int, List[Dict[str, Any]]]]:
+    if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+        return []
+    result = []
+    for name in os.listdir(settings.METRICS_DIR):
+        pid, _, extension = name.partition(".")
+        if extension != "json" or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        path = os.path.join(settings.METRICS_DIR, name)
+        try:
+            with open(path) as f:
+                exported = json.load(f)
+            if time.time() - os.path.getmtime(path) > settings.METRICS_STALE_SECONDS:
+                # Counts of exited processes still add up; their gauges no longer describe anything
+                exported = [metric for metric in exported if metric["kind"] != "gauge"]
+            result.append((int(pid), exported))
+        except (OSError, ValueError):
+            continue
+    return result
+
+def _merged() -> Dict[str, Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    sources = [(None, _export())] + _published()
+    for pid, exported in sources:
+        for metric in exported:
+            target = merged.setdefault(metric["name"], {**metric, "samples": {}})
+            if target["kind"] != metric["kind"] or target["buckets"] != metric["buckets"]:
+                continue
+            for labels, value in metric["samples"]:
+                labels = [tuple(label) for label in labels]
+                if metric["kind"] == "gauge" and pid is not None:
+                    labels.append(("pid", str(pid)))
+                key = tuple(sorted(labels))
+                existing = target["samples"].get(key)
+                if existing is None:
+                    target["samples"][key] = value
+                elif metric["kind"] == "histogram":
+                    existing["count"] += value["count"]
+                    existing["sum"] += value["sum"]
+                    existing["buckets"] = [a + b for a, b in zip(existing["buckets"], value["buckets"])]
+                else:
+                    target["samples"][key] = existing + value
+    return merged
+
+def _format_labels(labels, extra: Tuple[str, str] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def render() -> str:
+    """All metrics of this and the publishing worker processes, in the Prometheus text format."""
+    lines = []
+    for name, metric in sorted(_merged().items()):
+        lines.append(f"# HELP {name} {metric['description']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["kind"] == "histogram":
+                for bound, count in zip(metric["buckets"], value["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics of this process as plain data, for the stats endpoint."""
+    _collect()
+    with _registry_lock:
+        metrics = list(_registry.values())
+    result = {}
+    for metric in metrics:
+        values = {}
+        for key, value in metric.samples().items():
+            label = ",".join(f"{name}={label_value}" for name, label_value in key) or "total"
+            if isinstance(value, dict):
+                value = {"count": value["count"], "sum": round(value["sum"], 6)}
+            values[label] = value
+        result[metric.name] = values
+    return result
@@ -0,0 +1,271 @@
+# app/model_registry.py
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+from loguru import logger
+from .config import settings
+from . import metrics
+
+def estimate_size_bytes(obj: Any) -> int:
+    """Approximate memory held by a torch model (or tuple/pipeline containing one)."""
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_size_bytes(item) for item in obj)
+    module = getattr(obj, "model", obj)
+    parameters = getattr(module, "parameters", None)
+    if not callable(parameters):
+        return 0
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters())
+    except Exception:
+        return 0
+
+def available_memory_bytes() -> Optional[int]:
+    """MemAvailable from /proc/meminfo, or None where it cannot be read."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+class ModelCache:
+    """Thread-safe LRU cache of loaded models, bounded by entry count and estimated bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int, min_free_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the cache lock so other keys stay available; concurrent
+        # misses on the same key wait for the first load instead of repeating it.
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+            started = time.perf_counter()
+            value = loader()
+            elapsed = time.perf_counter() - started
+            size = estimate_size_bytes(value)
+            logger.info(f"Loaded model {key} in {elapsed:.2f}s ({size / 2**20:.0f} MB)")
+            with self._lock:
+                self.load_seconds += elapsed
+                self._entries[key] = (value, size)
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+            return value
+
+    def _evict(self, keep: Hashable) -> None:
+        def over_budget() -> bool:
+            if len(self._entries) > self.max_entries:
+                return True
+            if self.max_bytes and sum(size for _, size in self._entries.values()) > self.max_bytes:
+                return True
+            available = available_memory_bytes()
+            return bool(self.min_free_bytes and available is not None and available < self.min_free_bytes)
+
+        while len(self._entries) > 1 and over_budget():
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._entries.pop(key)
+            self.evictions += 1
+            logger.info(f"Evicted model {key} from cache")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(size for _, size in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 3),
+                "keys": [list(key) if isinstance(key, tuple) else key for key in self._entries],
+            }
+
+class WhisperModelPool:
+    """Lazily loaded WhisperX models, checked out one caller at a time."""
+
+    def __init__(self, instances: int):
+        self.instances = instances
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self.load_seconds = 0.0
+
+    @property
+    def loaded(self) -> int:
+        return self._loaded
+
+    def _load(self) -> Any:
+        import whisperx
+        device = get_device()
+        logger.info(f"Loading WhisperX {settings.WHISPER_MODEL_SIZE} model ({device}, {compute_type()})...")
+        started = time.perf_counter()
+        options = {"threads": settings.WHISPER_CPU_THREADS} if settings.WHISPER_CPU_THREADS else {}
+        model = whisperx.load_model(settings.WHISPER_MODEL_SIZE, device=device, compute_type=compute_type(), **options)
+        self.load_seconds += time.perf_counter() - started
+        return model
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """Borrow an idle instance, loading a new one while under the configured count."""
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_load = self._loaded < self.instances
+                if can_load:
+                    self._loaded += 1
+            if can_load:
+                try:
+                    model = self._load()
+                except Exception:
+                    with self._lock:
+                        self._loaded -= 1
+                    raise
+            else:
+                model = self._idle.get()
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def preload(self) -> None:
+        """Load one instance ahead of the first request."""
+        with self.checkout():
+            pass
+
+_device: Optional[str] = None
+
+def get_device() -> str:
+    """Inference device, resolved on first use so torch is only imported where models run."""
+    global _device
+    if _device is None:
+        if settings.WHISPER_DEVICE != "auto":
+            _device = settings.WHISPER_DEVICE
+        else:
+            import torch
+            _device = "cuda" if torch.cuda.is_available() else "cpu"
+    return _device
+
+def compute_type() -> str:
+    return settings.WHISPER_COMPUTE_TYPE or ("float16" if get_device() == "cuda" else "int8")
+
+# Parameters of the Whisper checkpoints and bytes per weight, to plan memory before loading
+WHISPER_PARAMETERS = {"tiny": 39e6, "base": 74e6, "small": 244e6, "medium": 769e6, "turbo": 809e6, "large": 1550e6}
+WEIGHT_BYTES = {"int8": 1, "float16": 2, "bfloat16": 2, "float32": 4}
+
+def whisper_model_mb() -> int:
+    """Resident size of one Whisper instance: WHISPER_MODEL_MB, or estimated from the model size and compute type."""
+    if settings.WHISPER_MODEL_MB:
+        return settings.WHISPER_MODEL_MB
+    name = settings.WHISPER_MODEL_SIZE.lower()
+    size = "turbo" if "turbo" in name else name.split(".")[0].split("-")[0]
+    parameters = WHISPER_PARAMETERS.get(size, WHISPER_PARAMETERS["large"])
+    weight_bytes = WEIGHT_BYTES.get(compute_type().split("_")[0], 4)  # e.g. int8_float16 stores int8 weights
+    return int(parameters * weight_bytes / 2**20)
+
+whisper_models = WhisperModelPool(settings.WHISPER_MODEL_INSTANCES)
+
+def whisper_model():
+    """Context manager yielding a WhisperX model instance."""
+    return whisper_models.checkout()
+
+cache = ModelCache(
+    max_entries=settings.MODEL_CACHE_SIZE,
+    max_bytes=settings.MODEL_CACHE_MAX_MB * 2**20,
+    min_free_bytes=settings.MODEL_CACHE_MIN_FREE_MB * 2**20,
+)
+
+def get_align_model(language: str, device: str):
+    """Alignment model and metadata for `language`, loaded once per (language, device)."""
+    import whisperx
+    return cache.get_or_load(
+        ("align", language, device),
+        lambda: whisperx.load_align_model(language_code=language, device=device),
+    )
+
+def get_diarization_pipeline(device: str):
+    """Speaker diarization pipeline, loaded once per device."""
+    import whisperx
+    return cache.get_or_load(
+        ("diarize", None, device),
+        lambda: whisperx.DiarizationPipeline(use_auth_token=settings.HF_TOKEN, device=device),
+    )
+
+def warm_up() -> None:
+    """Preload the WhisperX model and the alignment models of the configured languages."""
+    device = get_device()
+    if settings.WHISPER_PRELOAD:
+        whisper_models.preload()
+    for language in filter(None, (code.strip() for code in settings.ALIGN_WARMUP_LANGUAGES.split(","))):
+        try:
+            get_align_model(language, device)
+        except Exception as e:
+            logger.error(f"Failed to warm up alignment model for {language}: {e}")
+    if settings.DIARIZATION_WARMUP:
+        try:
+            get_diarization_pipeline(device)
+        except Exception as e:
+            logger.error(f"Failed to warm up diarization pipeline: {e}")
+
+def stats() -> Dict[str, Any]:
+    return {
+        "whisper": {
+            "model": settings.WHISPER_MODEL_SIZE,
+            "loaded": whisper_models.loaded,
+            "instances": whisper_models.instances,
+            "load_seconds": round(whisper_models.load_seconds, 3),
+        },
+        "cache": cache.stats(),
+    }
+
+model_gauges = {
+    name: metrics.gauge(f"model_{name}", description)
+    for name, description in (
+        ("cache_entries", "Models held in the model cache"),
+        ("cache_bytes", "Estimated bytes held by cached models"),
+        ("cache_hits", "Model cache hits since process start"),
+        ("cache_misses", "Model cache misses since process start"),
+        ("cache_evictions", "Model cache evictions since process start"),
+        ("load_seconds", "Seconds spent loading models since process start, by kind"),
+        ("whisper_loaded", "Loaded WhisperX model instances"),
+    )
+}
+
+@metrics.register_collector
+def collect_model_metrics() -> None:
+    cache_stats = cache.stats()
+    for name in ("entries", "bytes", "hits", "misses", "evictions"):
+        model_gauges[f"cache_{name}"].set(cache_stats[name])
+    model_gauges["load_seconds"].set(cache_stats["load_seconds"], kind="cache")
+    model_gauges["load_seconds"].set(whisper_models.load_seconds, kind="whisper")
+    model_gauges["whisper_loaded"].set(whisper_models.loaded)
@@ -1,21 +1,51 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, TIMESTAMP, JSON, ARRAY, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import func, Column, BigInteger, Integer, SmallInteger, String, Float, Text, CHAR, TIMESTAMP, JSON, ARRAY, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 import uuid
+from datetime import datetime
 
 Base = declarative_base()
 
+class GUID(TypeDecorator):
+    """Native UUID on PostgreSQL, CHAR(36) elsewhere (e.g. SQLite for local benchmarks)."""
+    impl = CHAR(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(UUID(as_uuid=True))
+        return dialect.type_descriptor(CHAR(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return str(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(value)
+
+# JSONB on PostgreSQL (binary storage, indexable), plain JSON elsewhere
+JSONBType = JSON().with_variant(JSONB(), "postgresql")
+StringArray = ARRAY(String).with_variant(JSON(), "sqlite")
+
 class Conversation(Base):
     __tablename__ = "conversations_test"
     __table_args__ = (
         UniqueConstraint('conversation_id', name='conversations_conversation_test_id_key'),
+        # Composite indexes matching the /conversations filters; `id` completes the keyset order
+        Index('ix_conversations_tenant_start', 'tenant_id', 'call_start_timestamp', 'id'),
+        Index('ix_conversations_tenant_rep_start', 'tenant_id', 'representative_id', 'call_start_timestamp', 'id'),
+        Index('ix_conversations_start', 'call_start_timestamp', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(Integer, nullable=False)
-    conversation_id = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, nullable=False)
+    conversation_id = Column(GUID(), default=uuid.uuid4, unique=True, nullable=False)
     insent_timestamp = Column(TIMESTAMP(timezone=True), nullable=False)
     call_id = Column(String(255))
     callee_phone_number = Column(String(255))
@@ -31,9 +61,13 @@ class Conversation(Base):
     representative_id = Column(String(255), nullable=False)
     representative_name = Column(String(255), nullable=False)
     representative_details = Column(JSON)
-    conversation_transcript = Column(JSON, nullable=False)
-    conversation_summary = Column(String(255))
-    tags = Column(ARRAY(String))
+    conversation_transcript = Column(JSONBType)  # Rows stored before the compact format, or with TRANSCRIPT_STORAGE=json
+    transcript_encoded = Column(LargeBinary)  # See app/transcripts.py
+    transcript_version = Column(SmallInteger)
+    conversation_summary = Column(Text)
+    summary_status = Column(String(20))  # "done", or "pending" while the summarizer is unavailable
+    summary_claimed_at = Column(TIMESTAMP(timezone=True))  # Set while a worker retries a pending summary
+    tags = Column(StringArray)
     sentiment = Column(JSON)
     resolution_status = Column(String(50))
     audio_file_id = Column(String(255))
@@ -47,3 +81,73 @@ class APIKey(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    rate_limit_per_minute = Column(Float)  # Files per minute; NULL uses RATE_LIMIT_FILES_PER_MINUTE
+    rate_limit_burst = Column(Integer)  # NULL uses RATE_LIMIT_BURST
+    key_version = Column(Integer, nullable=False, default=1, server_default="1")  # Carried in tokens; bumped when the key is rotated or revoked
+    revoked_at = Column(TIMESTAMP(timezone=True))  # Revoked keys keep their row, so other processes see the change
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, default=func.now(), onupdate=func.now(), index=True)  # Database clock; polled by app/auth.py
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim order, see app/scheduler.py
+        Index('ix_jobs_status_priority_start', 'status', 'priority', 'fair_start'),
+    )
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    tenant_id = Column(Integer)
+    priority = Column(SmallInteger, nullable=False, default=0, server_default="0")  # Rank of the priority class; lower is served first
+    fair_start = Column(Float, nullable=False, default=0.0, server_default="0")  # Virtual start and finish tags of fair queuing
+    fair_finish = Column(Float, nullable=False, default=0.0, server_default="0")
+    stage = Column(String(50))
+    progress = Column(Float, nullable=False, default=0.0)
+    stages = Column(JSON)
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AudioFingerprint(Base):
+    __tablename__ = "audio_fingerprints"
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'content_hash', 'language', 'model_version', name='audio_fingerprints_content_key'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    language = Column(String(50), nullable=False)
+    model_version = Column(String(100), nullable=False)
+    conversation_id = Column(GUID(), nullable=False, index=True)
+    job_id = Column(GUID())
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+class SummaryChunk(Base):
+    """Summary of one transcript chunk, keyed by a hash of the chunk text and language."""
+    __tablename__ = "summary_chunks"
+
+    key = Column(String(64), primary_key=True)
+    summary = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+class TranscriptSegment(Base):
+    """One transcript segment in the search index; `terms` are its tokens as produced by app/search.py."""
+    __tablename__ = "transcript_segments"
+    __table_args__ = (
+        # GIN is PostgreSQL's inverted index; it answers `terms @> ARRAY[...]` from posting lists
+        Index('ix_transcript_segments_terms', 'terms', postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index('ix_transcript_segments_tenant_start', 'tenant_id', 'call_start_timestamp'),
+        Index('ix_transcript_segments_conversation', 'conversation_id', 'segment'),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    tenant_id = Column(Integer, nullable=False)
+    conversation_id = Column(GUID(), nullable=False)
+    call_start_timestamp = Column(TIMESTAMP(timezone=True), nullable=False)
+    segment = Column(Integer, nullable=False)  # Position in the transcript
+    speaker = Column(String(100))
+    timestamp = Column(Float, nullable=False)
+    text = Column(Text, nullable=False)
+    terms = Column(StringArray, nullable=False)
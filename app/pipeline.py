@@ -0,0 +1,311 @@
+# app/pipeline.py
+
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Union
+from loguru import logger
+from sqlalchemy import insert, or_
+from . import models, database, metrics, search, storage, tracing, transcripts
+from .logging_config import preview
+
+# Processing stages, in order, reported through the job status
+STAGES = ("transcribe", "align", "diarize", "summarize", "save")
+
+# Conversation.summary_status values
+SUMMARY_DONE = "done"
+SUMMARY_PENDING = "pending"
+SUMMARY_CLAIM_TIMEOUT = timedelta(minutes=30)  # Older claims were left by a worker that stopped mid-retry
+
+real_time_factor = metrics.histogram(
+    "pipeline_real_time_factor",
+    "Transcription, alignment and diarization time per second of audio, per file",
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+audio_seconds = metrics.counter("pipeline_audio_seconds_total", "Seconds of audio processed")
+files_processed = metrics.counter("pipeline_files_total", "Files through the pipeline, by outcome")
+
+def serialize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Make call metadata JSON-safe so it can be stored in a job payload."""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in metadata.items()}
+
+def deserialize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `serialize_metadata` for the timestamp fields."""
+    restored = dict(metadata)
+    for key in ("insent_timestamp", "call_start_timestamp", "call_end_timestamp"):
+        if isinstance(restored.get(key), str):
+            restored[key] = datetime.fromisoformat(restored[key])
+    return restored
+
+def analyze(audio, result: Dict[str, Any], report: Callable[[str], None], trace: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Align and diarize one transcribed file into the stored transcript format."""
+    from . import transcription
+
+    report("align")
+    with tracing.stage("align", trace):
+        result = transcription.align(result, audio)
+    report("diarize")
+    with tracing.stage("diarize", trace):
+        result = transcription.diarize(result, audio)
+    transcript_data = transcription.build_transcript(result)
+    logger.opt(lazy=True).debug("Transcribed audio: {}", lambda: preview(transcript_data))
+    return transcript_data
+
+def conversation_row(payload: Dict[str, Any], transcript_data: Dict[str, Any], summary: Optional[str], audio_file_details: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of the conversation stored for one processed file."""
+    metadata = deserialize_metadata(payload["metadata"])
+    return dict(
+        tenant_id=metadata["tenant_id"],
+        conversation_id=uuid.UUID(payload["conversation_id"]),
+        insent_timestamp=metadata["insent_timestamp"],
+        call_id=metadata["call_id"],
+        callee_phone_number=metadata["callee_phone_number"],
+        caller_phone_number=metadata["caller_phone_number"],
+        call_start_timestamp=metadata["call_start_timestamp"],
+        call_end_timestamp=metadata["call_end_timestamp"],
+        call_duration=int((metadata["call_end_timestamp"] - metadata["call_start_timestamp"]).total_seconds()),
+        customer_id=None,  # Populate as needed
+        customer_details=None,  # Populate as needed
+        call_project_id=None,  # Populate as needed
+        call_project_details=None,  # Populate as needed
+        crm_date=None,  # Populate as needed
+        representative_id=metadata["representative_id"],
+        representative_name=payload["representative_name"],
+        representative_details=None,  # Populate as needed
+        **transcripts.columns(transcript_data),
+        conversation_summary=summary,  # Assigning summary here
+        summary_status=SUMMARY_DONE if summary is not None else SUMMARY_PENDING,
+        tags=None,  # Populate as needed
+        sentiment=None,  # Populate as needed
+        resolution_status=None,  # Populate as needed
+        audio_file_id=audio_file_details.get("storage", {}).get("key", payload["file_path"]),
+        audio_file_details=audio_file_details,
+        language=payload["language"],
+        analytics=None  # Populate as needed
+    )
+
+def save_many(rows: List[Dict[str, Any]], trace: Optional[Dict[str, str]] = None) -> List[int]:
+    """Store several conversations in one multi-row INSERT and one commit; returns their row IDs in order."""
+    if not rows:
+        return []
+    statement = insert(models.Conversation).returning(models.Conversation.id, sort_by_parameter_order=True)
+    db = database.SessionLocal()
+    try:
+        with tracing.stage("db_commit", trace, rows=len(rows)):
+            ids = list(db.scalars(statement, rows))
+            # Searchable as soon as they are visible
+            search.index(db, rows)
+            db.commit()
+    finally:
+        db.close()
+    logger.info(f"Saved {len(rows)} conversations to database.")
+    return ids
+
+def save(payload: Dict[str, Any], transcript_data: Dict[str, Any], summary: Optional[str], audio_file_details: Dict[str, Any]) -> Dict[str, Any]:
+    """Store one processed file as a conversation."""
+    save_many([conversation_row(payload, transcript_data, summary, audio_file_details)], payload.get("trace"))
+    return {"conversation_id": payload["conversation_id"]}
+
+def _observe_summary(submitted: float, future: "Future[str]") -> None:
+    tracing.stage_seconds.observe(time.perf_counter() - submitted, stage="summarize")
+
+def _save_batch(indexes: List[int], payloads: List[Dict[str, Any]], rows: Dict[int, Dict[str, Any]], outcomes: List[Any]) -> None:
+    """Save a batch's conversations together, or one by one if the batch insert fails."""
+    try:
+        save_many([rows[index] for index in indexes])
+    except Exception as e:
+        if len(indexes) == 1:
+            outcomes[indexes[0]] = e
+            return
+        # Find the offending rows without failing the rest of the batch
+        logger.warning(f"Batch insert of {len(indexes)} conversations failed, saving individually: {e}")
+        for index in indexes:
+            _save_batch([index], payloads, rows, outcomes)
+        return
+    for index in indexes:
+        outcomes[index] = {"conversation_id": payloads[index]["conversation_id"]}
+
+def store_audio(payload: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    """
+    Archive a processed recording, keeping the WAV until its conversation is
+    saved. If archiving fails the WAV stays in place for the lifecycle job.
+    """
+    try:
+        with tracing.stage("archive", payload.get("trace")):
+            return storage.archive(payload["file_path"], duration, remove_source=False)
+    except Exception as e:
+        logger.warning(f"Archiving {payload['file_path']} failed, keeping it as PCM: {e}")
+        return storage.describe_pcm(payload["file_path"], duration)
+
+def _remove_archived(payload: Dict[str, Any], audio_file_details: Dict[str, Any]) -> None:
+    """Remove the processing WAV of a saved conversation unless it is the stored recording itself."""
+    if audio_file_details["storage"]["codec"] != storage.PCM or audio_file_details["storage"]["backend"] != "local":
+        try:
+            os.remove(payload["file_path"])
+        except OSError as e:
+            logger.warning(f"Failed to remove {payload['file_path']} after archiving: {e}")
+
+def run_batch(payloads: List[Dict[str, Any]], reports: List[Callable[[str], None]]) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Process several jobs, transcribing them in shared forward passes and
+    summarizing them concurrently. Returns one result dict or exception per
+    payload; a failure in one file does not fail the others, and a failed
+    summary leaves the conversation with its summary pending.
+    """
+    # Imported here so that only worker processes load the transcription models
+    from . import batching, chunking, summarizer
+    from .audio import load_audio, describe
+
+    # Each file is decoded once; the same buffer feeds transcription, alignment and diarization
+    outcomes: List[Union[Dict[str, Any], Exception]] = [None] * len(payloads)
+    signals = {}
+    for index, (payload, report) in enumerate(zip(payloads, reports)):
+        report("transcribe")
+        try:
+            signals[index] = load_audio(payload["file_path"])
+        except Exception as e:
+            outcomes[index] = Exception(f"Failed to decode audio: {e}")
+
+    # Long recordings are split across the chunk pool; the rest share batched forward passes
+    results, compute_seconds = {}, {}
+    for index in [index for index in signals if chunking.is_long(signals[index])]:
+        started = time.perf_counter()
+        try:
+            with tracing.stage("transcribe", payloads[index].get("trace"), chunked=True):
+                results[index] = chunking.transcribe_long(payloads[index]["file_path"], signals[index], payloads[index]["language"])
+        except Exception as e:
+            signals.pop(index)
+            outcomes[index] = Exception(f"Transcription failed: {e}")
+        compute_seconds[index] = time.perf_counter() - started
+    short = [index for index in signals if index not in results]
+    if short:
+        started = time.perf_counter()
+        try:
+            with tracing.stage("transcribe", files=len(short)):
+                results.update(zip(short, batching.transcribe_batch([(signals[index], payloads[index]["language"]) for index in short])))
+        except Exception as e:
+            for index in short:
+                signals.pop(index)
+                outcomes[index] = Exception(f"Transcription failed: {e}")
+        # A shared forward pass is attributed to its files by their share of the audio
+        elapsed = time.perf_counter() - started
+        total = sum(len(signals[index]) for index in short if index in signals) or 1
+        for index in short:
+            if index in signals:
+                compute_seconds[index] = elapsed * len(signals[index]) / total
+
+    transcript_data, details, summaries, rows = {}, {}, {}, {}
+    for index, result in sorted(results.items()):
+        try:
+            audio = signals.pop(index)
+            details[index] = describe(audio)
+            started = time.perf_counter()
+            transcript_data[index] = analyze(audio, result, reports[index], payloads[index].get("trace"))
+            compute_seconds[index] += time.perf_counter() - started
+            if details[index]["duration"]:
+                real_time_factor.observe(compute_seconds[index] / details[index]["duration"])
+                audio_seconds.inc(details[index]["duration"])
+            # Summaries of the whole batch are requested before waiting on any of them
+            reports[index]("summarize")
+            summaries[index] = summarizer.submit_transcript(transcript_data[index], payloads[index]["language"])
+            # Summaries run concurrently, so this is each file's latency rather than exclusive time
+            summaries[index].add_done_callback(partial(_observe_summary, time.perf_counter()))
+        except Exception as e:
+            outcomes[index] = e
+
+    for index, future in summaries.items():
+        # Transcoding overlaps with the summaries still in flight
+        try:
+            details[index]["storage"] = store_audio(payloads[index], details[index]["duration"])
+        except Exception as e:
+            outcomes[index] = e
+            continue
+        try:
+            summary = future.result()
+            logger.opt(lazy=True).debug("Summarized transcript: {}", lambda: preview(summary))
+        except Exception as e:
+            logger.warning(f"Summary pending for conversation {payloads[index]['conversation_id']}: {e}")
+            summary = None
+        try:
+            reports[index]("save")
+            rows[index] = conversation_row(payloads[index], transcript_data[index], summary, details[index])
+        except Exception as e:
+            outcomes[index] = e
+    # The whole batch is stored in one transaction
+    with tracing.stage("save", files=len(rows)):
+        _save_batch(sorted(rows), payloads, rows, outcomes)
+    for index in rows:
+        if not isinstance(outcomes[index], Exception):
+            _remove_archived(payloads[index], details[index])
+
+    for outcome in outcomes:
+        files_processed.inc(outcome="failed" if isinstance(outcome, Exception) else "done")
+    return outcomes
+
+def retry_pending_summaries(limit: int = 10) -> int:
+    """
+    Summarize conversations whose summary failed earlier; returns how many
+    were completed. Rows are claimed and committed first, so no transaction
+    stays open while the summarizer is called; each result is then written
+    in its own short transaction, if the claim still holds.
+    """
+    from . import summarizer
+    if summarizer.client.breaker.state == "open":
+        return 0
+    table = models.Conversation
+    claim = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        conversations = (
+            db.query(table)
+            .filter(
+                table.summary_status == SUMMARY_PENDING,
+                or_(table.summary_claimed_at.is_(None), table.summary_claimed_at < claim - SUMMARY_CLAIM_TIMEOUT),
+            )
+            .order_by(table.id)
+            .with_for_update(skip_locked=True)
+            .limit(limit)
+            .all()
+        )
+        pending = [(c.id, c.conversation_id, transcripts.load(c), c.language or "he") for c in conversations]
+        for conversation in conversations:
+            conversation.summary_claimed_at = claim
+        db.commit()
+
+        completed = 0
+        futures = [(row_id, conversation_id, summarizer.submit_transcript(transcript_data, language)) for row_id, conversation_id, transcript_data, language in pending]
+        for row_id, conversation_id, future in futures:
+            try:
+                summary = future.result()
+            except Exception as e:
+                logger.warning(f"Summary still pending for conversation {conversation_id}: {e}")
+                summary = None
+            values = {"summary_claimed_at": None}
+            if summary is not None:
+                values.update(conversation_summary=summary, summary_status=SUMMARY_DONE)
+            try:
+                updated = (
+                    db.query(table)
+                    .filter(table.id == row_id, table.summary_claimed_at == claim)
+                    .update(values, synchronize_session=False)
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to record the summary of conversation {conversation_id}: {e}")
+                continue
+            if summary is not None and updated:
+                completed += 1
+        return completed
+    finally:
+        db.close()
+
+def run_job(payload: Dict[str, Any], report: Callable[[str], None]) -> Dict[str, Any]:
+    """Transcribe, summarize and store one uploaded file."""
+    outcome = run_batch([payload], [report])[0]
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
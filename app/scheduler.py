@@ -0,0 +1,187 @@
+# app/scheduler.py
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .config import settings
+from . import metrics
+
+# Transcription capacity is shared between tenants by start-time fair
+# queuing. A job costs the seconds of audio it carries divided by its
+# tenant's weight. Its start tag is the later of the virtual time (the
+# smallest start tag still queued in its priority class) and the finish tag
+# of its tenant's last queued job; jobs are claimed in start-tag order. A
+# tenant backfilling thousands of calls therefore queues behind its own
+# earlier jobs, while a tenant with nothing queued is served next.
+# Priority classes are strict: backfill jobs are claimed only while no live
+# job is waiting. Both job queue backends use this ordering; the database
+# backend stores the tags on the jobs table.
+PRIORITIES = ("live", "backfill")
+DEFAULT_PRIORITY = "live"
+BYTES_PER_SECOND = 32000  # 16 kHz mono 16-bit PCM, as written by the ingest path
+MIN_COST = 1.0  # Seconds charged for any job, for its fixed overhead
+
+queue_depth = metrics.gauge("scheduler_queue_depth", "Jobs waiting for a worker, by tenant and priority")
+oldest_wait = metrics.gauge("scheduler_oldest_wait_seconds", "Age of the oldest waiting job, by tenant and priority")
+rate_limited = metrics.counter("rate_limited_files_total", "Uploaded files rejected by the per-key rate limit, by API key")
+
+def rank(priority: str) -> int:
+    """Position of a priority class; lower ranks are served first. Raises ValueError for unknown classes."""
+    try:
+        return PRIORITIES.index(priority)
+    except ValueError:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of: {', '.join(PRIORITIES)}")
+
+def parse_weights(spec: str) -> Dict[int, float]:
+    """
+    Tenant weights from "tenant:weight,..." as in SCHEDULER_TENANT_WEIGHTS;
+    raises ValueError for a malformed entry or a weight that is not positive.
+    """
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tenant_id, _, weight = item.partition(":")
+        try:
+            tenant_id, weight = int(tenant_id), float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid tenant weight {item!r}; expected tenant:weight")
+        # A job's cost is divided by its weight, so zero or negative weights have no meaning
+        if not (math.isfinite(weight) and weight > 0):
+            raise ValueError(f"Invalid tenant weight {item!r}; weights must be positive numbers")
+        weights[tenant_id] = weight
+    return weights
+
+def job_key(payload: Dict[str, Any]) -> Tuple[Optional[int], str]:
+    """Tenant and priority class of a job payload."""
+    return payload.get("metadata", {}).get("tenant_id"), payload.get("priority", DEFAULT_PRIORITY)
+
+def job_cost(payload: Dict[str, Any]) -> float:
+    """Seconds of audio in a job, from the size of its WAV."""
+    try:
+        return max(os.path.getsize(payload["file_path"]) / BYTES_PER_SECOND, MIN_COST)
+    except (KeyError, OSError):
+        return MIN_COST
+
+def labels(payload: Dict[str, Any]) -> Dict[str, str]:
+    """Metric labels of a job."""
+    tenant_id, priority = job_key(payload)
+    return {"tenant": str(tenant_id), "priority": priority}
+
+def assign_tags(
+    jobs: List[Tuple[Optional[int], int, float]],
+    virtual: Dict[int, float],
+    finish: Dict[Tuple[Optional[int], int], float],
+    weights: Dict[int, float],
+) -> List[Tuple[float, float]]:
+    """
+    Start and finish tags of new jobs, given as (tenant_id, rank, cost) in
+    arrival order. `virtual` maps each rank to its smallest queued start tag
+    and `finish` each (tenant_id, rank) to its largest queued finish tag;
+    `finish` is updated with the new jobs.
+    """
+    tags = []
+    for tenant_id, job_rank, cost in jobs:
+        start = max(virtual.get(job_rank, 0.0), finish.get((tenant_id, job_rank), 0.0))
+        finish[(tenant_id, job_rank)] = start + cost / weights.get(tenant_id, 1.0)
+        tags.append((start, finish[(tenant_id, job_rank)]))
+    return tags
+
+class FairQueue:
+    """In-memory queue in the same order as the jobs table's claims. Not thread-safe."""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None):
+        self.weights = parse_weights(settings.SCHEDULER_TENANT_WEIGHTS) if weights is None else weights
+        self._heaps: List[list] = [[] for _ in PRIORITIES]  # (start, sequence, tenant_id, enqueued_at, item)
+        self._sequence = itertools.count()
+        self._finish: Dict[Tuple[Optional[int], int], float] = {}
+        self._queued: Dict[Tuple[Optional[int], int], int] = {}
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in self._heaps)
+
+    def push(self, item: Any, tenant_id: Optional[int], priority: str = DEFAULT_PRIORITY, cost: float = MIN_COST) -> None:
+        job_rank = rank(priority)
+        heap = self._heaps[job_rank]
+        virtual = {job_rank: heap[0][0]} if heap else {}
+        (start, _), = assign_tags([(tenant_id, job_rank, cost)], virtual, self._finish, self.weights)
+        self._queued[(tenant_id, job_rank)] = self._queued.get((tenant_id, job_rank), 0) + 1
+        heapq.heappush(heap, (start, next(self._sequence), tenant_id, time.monotonic(), item))
+
+    def pop(self) -> Tuple[Any, Optional[int], str]:
+        """The next job as (item, tenant_id, priority); raises IndexError when empty."""
+        for job_rank, heap in enumerate(self._heaps):
+            if heap:
+                _, _, tenant_id, _, item = heapq.heappop(heap)
+                key = (tenant_id, job_rank)
+                self._queued[key] -= 1
+                if not self._queued[key]:
+                    # A tenant whose queue drained starts again from the virtual time
+                    del self._queued[key], self._finish[key]
+                return item, tenant_id, PRIORITIES[job_rank]
+        raise IndexError("pop from an empty FairQueue")
+
+    def stats(self) -> Dict[Tuple[Optional[int], str], Dict[str, float]]:
+        """Waiting jobs and the age of the oldest, per (tenant_id, priority)."""
+        now = time.monotonic()
+        result: Dict[Tuple[Optional[int], str], Dict[str, float]] = {}
+        for job_rank, heap in enumerate(self._heaps):
+            for _, _, tenant_id, enqueued_at, _ in heap:
+                entry = result.setdefault((tenant_id, PRIORITIES[job_rank]), {"jobs": 0, "oldest_seconds": 0.0})
+                entry["jobs"] += 1
+                entry["oldest_seconds"] = max(entry["oldest_seconds"], now - enqueued_at)
+        return result
+
+# Admission
+
+class TokenBucket:
+    """Holds up to `burst` tokens, refilled at `rate` per second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, amount: float = 1.0, now: Optional[float] = None) -> float:
+        """Take `amount` tokens and return 0, or take none and return the seconds until they are available."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        if amount > self.burst:
+            return math.inf
+        return (amount - self.tokens) / self.rate
+
+class RateLimiter:
+    """
+    Token buckets of uploaded files per API key, kept in this process: with
+    several API processes each one allows the configured rate.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, principal, files: int) -> float:
+        """Admit `files` uploads by `principal` and return 0, or the seconds to wait before retrying."""
+        per_minute = principal.rate_limit_per_minute
+        if per_minute is None:
+            per_minute = settings.RATE_LIMIT_FILES_PER_MINUTE
+        if per_minute <= 0:
+            return 0.0
+        burst = principal.rate_limit_burst or settings.RATE_LIMIT_BURST
+        with self._lock:
+            bucket = self._buckets.get(principal.username)
+            if bucket is None or bucket.rate != per_minute / 60 or bucket.burst != burst:
+                bucket = self._buckets[principal.username] = TokenBucket(per_minute / 60, burst)
+            wait = bucket.take(files)
+        if wait:
+            rate_limited.inc(files, api_key=principal.username)
+        return wait
+
+rate_limiter = RateLimiter()
@@ -24,6 +24,44 @@ class AudioUploadResponse(BaseModel):
     success: bool
     details: Optional[str]
     conversation_id: Optional[uuid.UUID]
+    job_id: Optional[uuid.UUID]
+
+class JobStatus(BaseModel):
+    job_id: uuid.UUID
+    status: str
+    stage: Optional[str]
+    progress: float
+    stages: Dict[str, str]
+    conversation_id: Optional[uuid.UUID]
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+# Schemas for live streaming
+
+class StreamStart(BaseModel):
+    # First message of a /stream-audio session; the call metadata of /upload-audio plus the audio format
+    tenant_id: int
+    insent_timestamp: Optional[datetime]
+    call_start_timestamp: Optional[datetime]
+    caller_phone_number: str
+    callee_phone_number: str
+    representative_id: str
+    representative_name: str
+    call_type: str = "inbound"
+    language: str = Field(..., description="Language of the audio, e.g., 'he' for Hebrew")
+    encoding: str = Field("pcm_s16le", description="'pcm_s16le' (raw little-endian 16-bit) or 'opus' (in Ogg or WebM)")
+    sample_rate: int = 16000
+    channels: int = 1
+
+class StreamSegments(BaseModel):
+    type: str  # "partial" segments may still change; "final" segments will not
+    segments: List[TranscriptSegment]
+
+class StreamSaved(BaseModel):
+    type: str = "saved"
+    conversation_id: uuid.UUID
+    job_id: uuid.UUID
 
 # Schemas for Retrieval
 
@@ -47,6 +85,7 @@ class ConversationMetadata(BaseModel):
     representative_details: Optional[Dict[str, Any]]
     conversation_transcript: Dict[str, Any]
     conversation_summary: Optional[str]
+    summary_status: Optional[str]
     tags: Optional[List[str]]
     sentiment: Optional[Dict[str, Any]]
     resolution_status: Optional[str]
@@ -60,3 +99,21 @@ class ConversationResponse(BaseModel):
 
 class ConversationsListResponse(BaseModel):
     conversations: List[ConversationMetadata]
+
+class ConversationsPageResponse(BaseModel):
+    # Rows hold only the requested `fields` of ConversationMetadata
+    conversations: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+class SearchHit(BaseModel):
+    conversation_id: uuid.UUID
+    tenant_id: int
+    call_start_timestamp: datetime
+    segment: int  # Position of the segment in the transcript
+    speaker: Optional[str]
+    timestamp: float
+    text: str
+
+class SearchResponse(BaseModel):
+    hits: List[SearchHit]
+    next_cursor: Optional[str]
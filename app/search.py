@@ -0,0 +1,194 @@
+# app/search.py
+
+import json
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import String, and_, cast, insert, or_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from .config import settings
+from . import database, models, transcripts
+
+# Transcripts are searchable through the transcript_segments table: one row
+# per segment with its normalized tokens in `terms`, which PostgreSQL indexes
+# with GIN. Hebrew text is normalized so spelling variants meet: niqqud and
+# cantillation marks are dropped, final letters map to their regular forms,
+# and geresh/gershayim inside acronyms are removed (צה"ל -> צהל). Hebrew
+# attaches prepositions and conjunctions to the word (ו, ה, ב, כ, ל, מ, ש),
+# so each token is also indexed without up to MAX_PREFIX of them; a search
+# for מתחרה then finds והמתחרה. Stripping can over-match, so phrases are
+# verified against the segment text before a hit is returned.
+PREFIX_LETTERS = "ובהכלמש"
+MAX_PREFIX = 3
+MIN_STEM = 2  # Letters that must remain after stripping prefixes
+SCAN_BATCH = 200  # Candidate segments fetched per query round
+
+# Combining diacritics, and Hebrew niqqud and cantillation (but not maqaf, paseq or sof pasuq)
+_MARKS = re.compile("[\u0300-\u036f\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]")
+_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+_ACRONYM_MARKS = re.compile(r"(?<=\w)[\"'׳״](?=\w)")
+_TOKEN = re.compile(r"\w+")
+
+def normalize(text: str) -> str:
+    text = _MARKS.sub("", unicodedata.normalize("NFKD", text))
+    text = _ACRONYM_MARKS.sub("", text)
+    return text.lower().translate(_FINAL_LETTERS)
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(normalize(text))
+
+def variants(token: str) -> List[str]:
+    """`token` and its forms without leading Hebrew prefix letters."""
+    forms = [token]
+    for _ in range(MAX_PREFIX):
+        if len(token) - 1 < MIN_STEM or token[0] not in PREFIX_LETTERS:
+            break
+        token = token[1:]
+        forms.append(token)
+    return forms
+
+def terms(text: str) -> List[str]:
+    """Index terms of a segment."""
+    return sorted({form for token in tokenize(text) for form in variants(token)})
+
+def matches(text: str, words: List[str], phrase: bool = True) -> bool:
+    """Whether `text` contains the query `words`, consecutively if `phrase`."""
+    forms = [set(variants(token)) for token in tokenize(text)]
+    if not phrase:
+        present = set().union(*forms) if forms else set()
+        return all(word in present for word in words)
+    return any(
+        all(word in forms[start + offset] for offset, word in enumerate(words))
+        for start in range(len(forms) - len(words) + 1)
+    )
+
+# Indexing
+
+def segment_rows(conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Index rows for a conversation given as its column values."""
+    transcript_data = transcripts.load(conversation)
+    return [
+        {
+            "tenant_id": conversation["tenant_id"],
+            "conversation_id": conversation["conversation_id"],
+            "call_start_timestamp": conversation["call_start_timestamp"],
+            "segment": position,
+            "speaker": segment.get("speaker"),
+            "timestamp": segment["timestamp"],
+            "text": segment["text"],
+            "terms": terms(segment["text"]),
+        }
+        for position, segment in enumerate((transcript_data or {}).get("transcript", []))
+        if segment.get("text", "").strip()
+    ]
+
+def index(db: Session, conversations: List[Dict[str, Any]]) -> int:
+    """Add conversations to the index within the caller's transaction; returns the segments written."""
+    if not settings.SEARCH_INDEX_ENABLED:
+        return 0
+    rows = [row for conversation in conversations for row in segment_rows(conversation)]
+    if rows:
+        db.execute(insert(models.TranscriptSegment), rows)
+    return len(rows)
+
+def reindex(batch_size: int = 500) -> int:
+    """Rebuild the index entries of every stored conversation; returns the conversations indexed."""
+    table = models.Conversation
+    columns = [
+        table.id, table.tenant_id, table.conversation_id, table.call_start_timestamp,
+        table.conversation_transcript, table.transcript_encoded, table.transcript_version,
+    ]
+    last_id, indexed = 0, 0
+    while True:
+        db = database.SessionLocal()
+        try:
+            batch = db.query(*columns).filter(table.id > last_id).order_by(table.id).limit(batch_size).all()
+            if not batch:
+                return indexed
+            conversations = [dict(row._mapping) for row in batch]
+            db.query(models.TranscriptSegment).filter(
+                models.TranscriptSegment.conversation_id.in_([c["conversation_id"] for c in conversations])
+            ).delete(synchronize_session=False)
+            index(db, conversations)
+            db.commit()
+        finally:
+            db.close()
+        last_id = batch[-1].id
+        indexed += len(batch)
+        logger.info(f"Indexed {indexed} conversations.")
+
+# Queries
+
+def search(
+    db: Session,
+    query: str,
+    tenant_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    phrase: bool = True,
+    limit: int = 50,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> Tuple[List[Any], Optional[Tuple[datetime, int]]]:
+    """
+    Segments matching `query`, newest call first, continuing after the
+    (call_start_timestamp, id) position `after`. Returns the hits and the
+    position to continue from, or None when nothing is left. At most
+    SEARCH_MAX_SCAN candidates are checked, so a page can hold fewer than
+    `limit` hits, even none, and still have a position to continue from.
+    Raises ValueError for a query without words.
+    """
+    words = tokenize(query)
+    if not words:
+        raise ValueError("The query has no searchable words.")
+    table = models.TranscriptSegment
+    candidates = db.query(
+        table.id, table.tenant_id, table.conversation_id, table.call_start_timestamp,
+        table.segment, table.speaker, table.timestamp, table.text,
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = candidates.filter(table.terms.op("@>")(postgresql.array(sorted(set(words)), type_=String)))
+    else:
+        # No inverted index outside PostgreSQL; match the serialized term list instead
+        for word in set(words):
+            candidates = candidates.filter(cast(table.terms, String).like(f"%{json.dumps(word)}%"))
+    if tenant_id is not None:
+        candidates = candidates.filter(table.tenant_id == tenant_id)
+    if start_date is not None:
+        candidates = candidates.filter(table.call_start_timestamp >= start_date)
+    if end_date is not None:
+        candidates = candidates.filter(table.call_start_timestamp <= end_date)
+
+    hits, scanned = [], 0
+    candidates = candidates.order_by(table.call_start_timestamp.desc(), table.id.desc())
+    while True:
+        page = candidates
+        if after is not None:
+            page = page.filter(or_(
+                table.call_start_timestamp < after[0],
+                and_(table.call_start_timestamp == after[0], table.id < after[1]),
+            ))
+        rows = page.limit(min(SCAN_BATCH, settings.SEARCH_MAX_SCAN - scanned)).all()
+        for row in rows:
+            after = (row.call_start_timestamp, row.id)
+            if matches(row.text, words, phrase):
+                hits.append(row)
+                if len(hits) == limit:
+                    return hits, after
+        scanned += len(rows)
+        if scanned >= settings.SEARCH_MAX_SCAN:
+            return hits, after
+        if len(rows) < SCAN_BATCH:
+            return hits, None
+
+if __name__ == "__main__":
+    # Backfill after enabling search on existing data: python -m app.search --reindex
+    import sys
+    if sys.argv[1:] == ["--reindex"]:
+        from . import logging_config
+        logging_config.setup_logging()
+        print(f"Indexed {reindex()} conversations.")
+    else:
+        print("Usage: python -m app.search --reindex")
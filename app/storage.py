@@ -0,0 +1,538 @@
+# app/storage.py
+
+import mmap
+import os
+import shutil
+import subprocess
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from .config import settings
+from . import metrics
+from .audio import SAMPLE_RATE, data_offset
+
+# Recordings are written as 16 kHz PCM WAVs under RECORDS_PATH while they
+# are processed. After transcription they are transcoded (Opus in Ogg, tuned
+# for speech, or lossless FLAC) and put in the storage backend under the
+# same key with the codec's extension, and the WAV is removed.
+# audio_file_details["storage"] records where a recording is, its codec and
+# a seek index of [seconds, byte offset] pairs, so playback can start at any
+# point with a range read. The lifecycle job transcodes recordings still in
+# PCM (failed transcodes, older rows) and deletes those past retention.
+PCM = "pcm_s16le"
+CODECS = {
+    "opus": {"extension": "opus", "container": "ogg", "media_type": "audio/ogg"},
+    "flac": {"extension": "flac", "container": "flac", "media_type": "audio/flac"},
+    "wav": {"extension": "wav", "container": "wav", "media_type": "audio/wav"},
+}
+
+archived_bytes = metrics.counter("storage_archived_bytes_total", "Bytes of recordings archived, by codec")
+source_bytes = metrics.counter("storage_source_bytes_total", "Bytes of PCM recordings before archiving, by codec")
+lifecycle_actions = metrics.counter("storage_lifecycle_total", "Recordings handled by the lifecycle job, by action")
+
+# Backends
+
+class StorageBackend:
+    """Interface implemented by the storage backends; keys are relative, '/'-separated paths."""
+
+    name = ""
+
+    def put_file(self, key: str, path: str) -> None:
+        """Store the file at `path` under `key`; the file is moved or removed."""
+        raise NotImplementedError
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes [start, end) of an object, in chunks."""
+        raise NotImplementedError
+
+    def size(self, key: str) -> Optional[int]:
+        """Size of an object in bytes, or None if it does not exist."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Files under a local directory."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put_file(self, key: str, path: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(settings.UPLOAD_CHUNK_SIZE if remaining is None else min(settings.UPLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+def _is_missing(error: Exception) -> bool:
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+class ObjectStorage(StorageBackend):
+    """An S3-compatible bucket, through a client with the boto3 S3 client's methods."""
+
+    name = "object"
+
+    def __init__(self, client, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_file(self, key: str, path: str) -> None:
+        with open(path, "rb") as f:
+            self.client.put_object(Bucket=self.bucket, Key=self.object_key(key), Body=f)
+        os.remove(path)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end - 1}"
+        body = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key), Range=byte_range)["Body"]
+        try:
+            while chunk := body.read(settings.UPLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))["ContentLength"]
+        except Exception as e:
+            if _is_missing(e):
+                return None
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+def create_storage() -> StorageBackend:
+    """Build the backend selected by `settings.STORAGE_BACKEND`."""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.RECORDS_PATH)
+    if settings.STORAGE_BACKEND == "object":
+        try:
+            import boto3
+        except ImportError:
+            raise ValueError("STORAGE_BACKEND=object needs the boto3 package.")
+        client = boto3.client("s3", endpoint_url=settings.STORAGE_ENDPOINT_URL or None)
+        return ObjectStorage(client, settings.STORAGE_BUCKET, settings.STORAGE_PREFIX)
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+def get_storage() -> StorageBackend:
+    """The storage backend of this process, created on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_storage()
+        return _backend
+
+def key_for(file_path: str) -> str:
+    """Storage key of a recording under RECORDS_PATH."""
+    relative = os.path.relpath(os.path.abspath(file_path), os.path.abspath(settings.RECORDS_PATH))
+    if relative.startswith(os.pardir):
+        raise ValueError(f"Recording is outside RECORDS_PATH: {file_path}")
+    return relative.replace(os.sep, "/")
+
+# Seek indexes
+
+def _seek_targets(duration: float) -> List[float]:
+    interval = settings.STORAGE_SEEK_INTERVAL_SECONDS
+    return [index * interval for index in range(1, int(duration / interval) + 1)] if interval > 0 else []
+
+def _ogg_pages(data, position: int) -> Iterator[Tuple[int, int]]:
+    """(offset, granule position) of the Ogg pages from the first page at or after `position`."""
+    position = data.find(b"OggS", position)
+    while 0 <= position and position + 27 <= len(data):
+        segments = data[position + 26]
+        if position + 27 + segments > len(data) or data[position + 4] != 0:
+            break
+        granule = int.from_bytes(data[position + 6:position + 14], "little", signed=True)
+        yield position, granule
+        position += 27 + segments + sum(data[position + 27:position + 27 + segments])
+
+def _opus_index(data, duration: float) -> Tuple[int, List[List[float]]]:
+    pre_skip = int.from_bytes(data[data.find(b"OpusHead") + 10:][:2], "little")
+    pages = list(_ogg_pages(data, 0))
+    # Header pages (OpusHead, OpusTags) carry granule 0; audio starts after them
+    audio_start = next((offset for offset, granule in pages if granule > 0), len(data))
+    index = [[0.0, audio_start]]
+    targets = iter(_seek_targets(duration))
+    target = next(targets, None)
+    for (_, granule), (next_offset, _) in zip(pages, pages[1:]):
+        if granule <= 0:
+            continue
+        # The next page's audio starts where this page's ends
+        seconds = (granule - pre_skip) / 48000
+        while target is not None and seconds >= target:
+            index.append([round(seconds, 3), next_offset])
+            target = next(targets, None)
+    return audio_start, index
+
+_CRC8 = []
+for _byte in range(256):
+    _crc = _byte
+    for _ in range(8):
+        _crc = ((_crc << 1) ^ 0x07) & 0xFF if _crc & 0x80 else (_crc << 1) & 0xFF
+    _CRC8.append(_crc)
+
+def _flac_frame(data, position: int, block_size: int) -> Optional[int]:
+    """First sample of the FLAC frame whose header starts at `position`, or None if there is none."""
+    header = data[position:position + 16]
+    if len(header) < 6 or header[0] != 0xFF or header[1] not in (0xF8, 0xF9) or header[3] & 1:
+        return None
+    # Frame or sample number, UTF-8 coded
+    if header[4] < 0x80:
+        length, number = 1, header[4]
+    elif header[4] >= 0xC0:
+        length = 8 - (header[4] ^ 0xFF).bit_length()
+        number = header[4] & (0x7F >> length)
+    else:
+        return None
+    for byte in header[5:4 + length]:
+        number = (number << 6) | (byte & 0x3F)
+    size = 4 + length + {6: 1, 7: 2}.get(header[2] >> 4, 0) + {12: 1, 13: 2, 14: 2}.get(header[2] & 0x0F, 0)
+    if size >= len(header):
+        return None
+    crc = 0
+    for byte in header[:size]:
+        crc = _CRC8[crc ^ byte]
+    if crc != header[size]:
+        return None
+    # Fixed block size streams number frames; variable ones number samples
+    return number * block_size if header[1] == 0xF8 else number
+
+def _flac_index(data, duration: float) -> Tuple[int, List[List[float]]]:
+    position, sample_rate, block_size = 4, SAMPLE_RATE, 4096
+    while True:
+        block_type, length = data[position] & 0x7F, int.from_bytes(data[position + 1:position + 4], "big")
+        if block_type == 0:  # STREAMINFO
+            block_size = int.from_bytes(data[position + 4:position + 6], "big")
+            sample_rate = int.from_bytes(data[position + 14:position + 17], "big") >> 4
+        last = data[position] & 0x80
+        position += 4 + length
+        if last:
+            break
+    audio_start = position
+    index = [[0.0, audio_start]]
+    size = len(data)
+    bytes_per_second = (size - audio_start) / duration if duration else 0
+    for target in _seek_targets(duration):
+        # Frame sizes vary little: search from a second before the proportional position, then walk forward
+        position = max(audio_start + int(bytes_per_second * (target - 1)), index[-1][1] + 1)
+        while position < size:
+            position = data.find(b"\xff", position)
+            if position < 0:
+                break
+            sample = _flac_frame(data, position, block_size)
+            if sample is not None and sample / sample_rate >= target:
+                index.append([round(sample / sample_rate, 3), position])
+                break
+            position += 1
+    return audio_start, index
+
+def seek_index(path: str, codec: str, duration: float) -> Tuple[int, List[List[float]]]:
+    """Byte offset of the first audio frame, and [seconds, offset] pairs where playback can start."""
+    if codec in (PCM, "wav"):
+        start = data_offset(path)
+        return start, [[seconds, start + int(seconds * SAMPLE_RATE) * 2] for seconds in [0.0] + _seek_targets(duration)]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return (_opus_index if codec == "opus" else _flac_index)(data, duration)
+
+def seek_offset(storage_details: Dict[str, Any], seconds: float) -> int:
+    """Byte offset in a stored recording from which playback covers `seconds` onwards."""
+    offset = storage_details["data_offset"]
+    for position, byte_offset in storage_details.get("seek_index") or []:
+        if position > seconds:
+            break
+        offset = byte_offset
+    return offset
+
+# Archiving
+
+def transcode(source: str, codec: str) -> str:
+    """Encode the WAV at `source` with `codec` next to it; returns the output path."""
+    extension = CODECS[codec]["extension"]
+    output = f"{os.path.splitext(source)[0]}.{extension}.part"
+    if codec == "opus":
+        arguments = ["-c:a", "libopus", "-b:a", str(settings.STORAGE_OPUS_BITRATE), "-application", "voip", "-f", "ogg"]
+    elif codec == "flac":
+        arguments = ["-c:a", "flac", "-compression_level", "8", "-f", "flac"]
+    else:
+        arguments = ["-c:a", PCM, "-f", "wav"]
+    process = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", source, *arguments, output],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        if os.path.exists(output):
+            os.remove(output)
+        raise Exception(f"Error transcoding audio: {process.stderr.decode(errors='replace').strip()}")
+    return output
+
+def describe_pcm(file_path: str, duration: float) -> Dict[str, Any]:
+    """Storage details of a recording still in its processing WAV."""
+    start, index = seek_index(file_path, PCM, duration)
+    return {
+        "backend": "local",
+        "key": key_for(file_path),
+        "codec": PCM,
+        **{name: value for name, value in CODECS["wav"].items() if name != "extension"},
+        "bytes": os.path.getsize(file_path),
+        "data_offset": start,
+        "seek_index": index,
+    }
+
+def archive(file_path: str, duration: float, codec: Optional[str] = None, remove_source: bool = True) -> Dict[str, Any]:
+    """
+    Transcode a processed WAV and store it in the backend, removing the WAV
+    unless `remove_source` is false. Returns the storage details recorded in
+    audio_file_details["storage"].
+    """
+    codec = codec or settings.STORAGE_CODEC
+    backend = get_storage()
+    if codec == "wav" and backend.name == "local":
+        # Already where it belongs
+        return {**describe_pcm(file_path, duration), "archived_at": datetime.utcnow().isoformat()}
+    source_size = os.path.getsize(file_path)
+    output = transcode(file_path, codec)
+    try:
+        start, index = seek_index(output, codec, duration)
+        size = os.path.getsize(output)
+        key = f"{os.path.splitext(key_for(file_path))[0]}.{CODECS[codec]['extension']}"
+        backend.put_file(key, output)
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+    if remove_source:
+        os.remove(file_path)
+    archived_bytes.inc(size, codec=codec)
+    source_bytes.inc(source_size, codec=codec)
+    logger.info(f"Archived {file_path} as {codec}: {source_size} -> {size} bytes.")
+    details = {
+        "backend": backend.name,
+        "key": key,
+        "codec": codec if codec != "wav" else PCM,
+        **{name: value for name, value in CODECS[codec].items() if name != "extension"},
+        "bytes": size,
+        "data_offset": start,
+        "seek_index": index,
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+    if codec == "opus":
+        details["bitrate"] = settings.STORAGE_OPUS_BITRATE
+    return details
+
+def locate(audio_file_id: Optional[str], details: Optional[Dict[str, Any]]) -> Tuple[StorageBackend, str, Dict[str, Any]]:
+    """Backend, key and storage details of a conversation's recording; raises FileNotFoundError if it has none."""
+    storage = (details or {}).get("storage")
+    if storage is not None:
+        if storage.get("expired_at"):
+            raise FileNotFoundError("The recording was deleted after its retention period.")
+        backend = get_storage() if storage["backend"] == get_storage().name else LocalStorage(settings.RECORDS_PATH)
+        return backend, storage["key"], storage
+    # Rows from before archiving store the WAV path itself
+    if not audio_file_id or not os.path.exists(audio_file_id):
+        raise FileNotFoundError("The recording is not available.")
+    directory, name = os.path.split(os.path.abspath(audio_file_id))
+    return LocalStorage(directory), name, {"codec": PCM, "media_type": "audio/wav", "bytes": os.path.getsize(audio_file_id)}
+
+# Lifecycle
+
+# Both passes walk conversations in ID order, resuming where the last pass stopped
+_expire_cursor = 0
+_compact_cursor = 0
+COMPACT_CLAIM_TIMEOUT = timedelta(hours=1)  # Older claims were left by a worker that stopped mid-transcode
+
+def _local_path(conversation) -> str:
+    """Path of a recording on the local backend, as seen from this host."""
+    storage_details = (conversation.audio_file_details or {}).get("storage")
+    if storage_details is not None:
+        return LocalStorage(settings.RECORDS_PATH).path(storage_details["key"])
+    # Rows from before archiving store the WAV path itself
+    return conversation.audio_file_id
+
+def _expire(conversation, now: datetime) -> str:
+    """Delete the recording of a conversation past retention; returns the lifecycle action taken."""
+    details = dict(conversation.audio_file_details or {})
+    if (details.get("storage") or {}).get("backend", "local") == "local" and not os.path.exists(_local_path(conversation)):
+        # It may be on another host's disk; a worker that sees it deletes it
+        logger.warning(f"Recording of conversation {conversation.id} is not on this host; skipping its expiry.")
+        return "skipped"
+    store, key, storage_details = locate(conversation.audio_file_id, details)
+    store.delete(key)
+    details["storage"] = {**storage_details, "expired_at": now.isoformat()}
+    conversation.audio_file_details = details
+    return "expired"
+
+def _finish_compaction(db, conversation_id, claim: str, stored: Optional[Dict[str, Any]]) -> bool:
+    """Record a transcoded recording, or with `stored` None just release the claim; False if the claim was lost."""
+    from . import models
+    conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).with_for_update().first()
+    details = dict(conversation.audio_file_details or {}) if conversation is not None else {}
+    if details.get("compacting") != claim:
+        db.rollback()
+        return False
+    del details["compacting"]
+    if stored is not None:
+        details["storage"] = stored
+        conversation.audio_file_id = stored["key"]
+    conversation.audio_file_details = details
+    db.commit()
+    return True
+
+def run_lifecycle(limit: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    One pass of the lifecycle job: delete recordings of calls older than
+    STORAGE_RETENTION_DAYS, and transcode recordings still in PCM. Rows are
+    claimed with SKIP LOCKED, so several workers can run it at once; rows to
+    transcode are marked as claimed and committed first, so no transaction
+    stays open while ffmpeg runs.
+    """
+    global _expire_cursor, _compact_cursor
+    from sqlalchemy import or_
+    from . import database, models
+    limit = limit or settings.STORAGE_LIFECYCLE_BATCH
+    now = now or datetime.utcnow()
+    counts = {"expired": 0, "compacted": 0, "skipped": 0, "failed": 0}
+    table = models.Conversation
+    backend = table.audio_file_details["storage"]["backend"].as_string()
+    codec = table.audio_file_details["storage"]["codec"].as_string()
+    expired = table.audio_file_details["storage"]["expired_at"].as_string()
+    compacting = table.audio_file_details["compacting"].as_string()
+    unclaimed = or_(compacting.is_(None), compacting < (now - COMPACT_CLAIM_TIMEOUT).isoformat())
+    db = database.SessionLocal()
+    try:
+        if settings.STORAGE_RETENTION_DAYS > 0:
+            cutoff = now - timedelta(days=settings.STORAGE_RETENTION_DAYS)
+            rows = (
+                db.query(table)
+                .filter(table.id > _expire_cursor, table.call_start_timestamp < cutoff, table.audio_file_id.isnot(None), expired.is_(None), unclaimed)
+                .order_by(table.id)
+                .with_for_update(skip_locked=True)
+                .limit(limit)
+                .all()
+            )
+            _expire_cursor = rows[-1].id if len(rows) == limit else 0
+            for conversation in rows:
+                try:
+                    counts[_expire(conversation, now)] += 1
+                except Exception as e:
+                    logger.error(f"Failed to delete the recording of conversation {conversation.id}: {e}")
+                    counts["failed"] += 1
+            db.commit()
+
+        if settings.STORAGE_CODEC != "wav":
+            # PCM recordings kept on local disk: transcodes that failed, and rows from before archiving
+            rows = (
+                db.query(table)
+                .filter(
+                    table.id > _compact_cursor,
+                    table.audio_file_id.isnot(None),
+                    or_(codec.is_(None), codec == PCM),
+                    or_(backend.is_(None), backend == "local"),
+                    expired.is_(None),
+                    unclaimed,
+                )
+                .order_by(table.id)
+                .with_for_update(skip_locked=True)
+                .limit(limit)
+                .all()
+            )
+            _compact_cursor = rows[-1].id if len(rows) == limit else 0
+            claim = now.isoformat()
+            claimed = []
+            for conversation in rows:
+                details = dict(conversation.audio_file_details or {})
+                claimed.append((conversation.id, _local_path(conversation), details.get("duration") or 0.0))
+                conversation.audio_file_details = {**details, "compacting": claim}
+            db.commit()
+
+            for conversation_id, path, duration in claimed:
+                stored, action = None, "compacted"
+                try:
+                    if os.path.exists(path):
+                        stored = archive(path, duration, remove_source=False)
+                    else:
+                        # It may be on another host's disk; a worker that sees it transcodes it
+                        logger.warning(f"Recording of conversation {conversation_id} is not at {path} on this host; skipping it.")
+                        action = "skipped"
+                except Exception as e:
+                    logger.error(f"Failed to archive {path}: {e}")
+                    action = "failed"
+                try:
+                    recorded = _finish_compaction(db, conversation_id, claim, stored)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to record the archived recording of conversation {conversation_id}: {e}")
+                    recorded = False
+                if stored is not None:
+                    try:
+                        # The row points at one copy; the other is removed
+                        if recorded:
+                            os.remove(path)
+                        else:
+                            get_storage().delete(stored["key"])
+                            action = "failed"
+                    except Exception as e:
+                        logger.warning(f"Failed to remove a copy of the recording of conversation {conversation_id}: {e}")
+                counts[action] += 1
+    finally:
+        db.close()
+    for action, count in counts.items():
+        if count:
+            lifecycle_actions.inc(count, action=action)
+    return counts
+
+if __name__ == "__main__":
+    # One lifecycle pass outside the workers: python -m app.storage --lifecycle
+    import sys
+    if sys.argv[1:] == ["--lifecycle"]:
+        from . import logging_config
+        logging_config.setup_logging()
+        total = {}
+        while True:
+            counts = run_lifecycle()
+            for action, count in counts.items():
+                total[action] = total.get(action, 0) + count
+            if not _expire_cursor and not _compact_cursor:
+                break
+        print(f"Lifecycle pass done: {total}")
+    else:
+        print("Usage: python -m app.storage --lifecycle")
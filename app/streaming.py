@@ -0,0 +1,240 @@
+# app/streaming.py
+
+import asyncio
+import re
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from .config import settings
+from . import executors, schemas, utils
+from .audio import SAMPLE_RATE
+
+# Live transcription re-runs the model over a sliding window of audio that
+# is not final yet. A segment becomes final once two consecutive passes
+# agree on it and later speech follows it; its audio is then dropped from
+# the window. The full recording goes to a WAV on disk, and on close it is
+# queued through the batch pipeline, so the stored conversation is the same
+# as for an upload of that recording.
+AGREEMENT_TOLERANCE_SECONDS = 0.5
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text).strip().lower()
+
+def _same_segment(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return abs(a["start"] - b["start"]) <= AGREEMENT_TOLERANCE_SECONDS and _normalize(a["text"]) == _normalize(b["text"])
+
+def to_transcript_segments(segments: List[Dict[str, Any]]) -> List[schemas.TranscriptSegment]:
+    # Same shape as transcription.build_transcript; live segments are not diarized yet
+    return [
+        schemas.TranscriptSegment(speaker=f"speaker_{segment.get('speaker', 'unknown')}", timestamp=segment["start"], text=segment["text"])
+        for segment in segments
+    ]
+
+def transcribe_window(audio: np.ndarray, language: str) -> List[Dict[str, Any]]:
+    """One transcription pass over the current window; offsets are relative to its start."""
+    from . import model_registry
+    with model_registry.whisper_model() as model:
+        result = model.transcribe(audio, language=language, batch_size=settings.WHISPER_BATCH_SIZE)
+    return [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in result["segments"] if s["text"].strip()]
+
+class SlidingWindow:
+    """Unfinalized audio of one stream and the last transcription hypothesis over it."""
+
+    def __init__(self):
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._pending: List[np.ndarray] = []  # Frames received since the audio was last joined
+        self.length = 0  # Samples in the window
+        self.start = 0.0  # Stream time of the window's first sample, in seconds
+        self.received = 0  # Samples received in total
+        self.transcribed_until = 0  # `received` at the start of the last pass
+        self.hypothesis: List[Dict[str, Any]] = []
+
+    @property
+    def audio(self) -> np.ndarray:
+        if self._pending:
+            self._audio = np.concatenate([self._audio, *self._pending])
+            self._pending = []
+        return self._audio
+
+    def feed(self, samples: np.ndarray) -> None:
+        self._pending.append(samples)
+        self.length += len(samples)
+        self.received += len(samples)
+        excess = self.length - int(settings.STREAM_MAX_BUFFER_SECONDS * SAMPLE_RATE)
+        if excess > 0:
+            # Transcription fell behind; the recording on disk still holds this audio
+            logger.warning(f"Live transcription is lagging; skipping {excess / SAMPLE_RATE:.1f}s of audio.")
+            self._drop(excess)
+            self.hypothesis = []
+
+    def _drop(self, samples: int) -> None:
+        audio = self.audio
+        samples = max(0, min(samples, len(audio)))
+        self._audio = audio[samples:]
+        self.length = len(self._audio)
+        self.start += samples / SAMPLE_RATE
+
+    def due(self) -> bool:
+        return self.received - self.transcribed_until >= settings.STREAM_STEP_SECONDS * SAMPLE_RATE
+
+    def snapshot(self) -> Tuple[np.ndarray, float]:
+        self.transcribed_until = self.received
+        return self.audio, self.start
+
+    def advance(self, segments: List[Dict[str, Any]], offset: float, final: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split a pass's segments into newly final and still partial ones, and drop the finalized audio."""
+        segments = [{**segment, "start": round(segment["start"] + offset, 3), "end": round(segment["end"] + offset, 3)} for segment in segments]
+        # Segments that ended before audio dropped while the pass ran were already covered
+        segments = [segment for segment in segments if segment["end"] > self.start]
+        if final:
+            stable = len(segments)
+        else:
+            stable = 0
+            while stable < len(segments) - 1 and any(_same_segment(segments[stable], previous) for previous in self.hypothesis):
+                stable += 1
+            if stable == 0 and self.length >= settings.STREAM_WINDOW_SECONDS * SAMPLE_RATE:
+                if segments:
+                    # The window is full without agreement; commit all but the segment still being spoken
+                    stable = max(1, len(segments) - 1)
+                else:
+                    # Nothing but silence or noise so far
+                    self._drop(self.length - int(settings.STREAM_STEP_SECONDS * SAMPLE_RATE))
+        finals, partials = segments[:stable], segments[stable:]
+        if finals:
+            self._drop(int((finals[-1]["end"] - self.start) * SAMPLE_RATE))
+        self.hypothesis = partials
+        return finals, partials
+
+class PCMDecoder:
+    """Decodes Opus or non-16 kHz PCM to 16 kHz mono PCM through an ffmpeg pipe."""
+
+    def __init__(self, start: schemas.StreamStart, on_pcm):
+        self.start = start
+        self.on_pcm = on_pcm
+        self.process = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def open(self) -> None:
+        if self.start.encoding == "opus":
+            source = []  # The container (Ogg or WebM) is probed from the stream
+        else:
+            source = ["-f", "s16le", "-ar", str(self.start.sample_rate), "-ac", str(self.start.channels)]
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            *source, "-i", "pipe:0",
+            "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.ensure_future(self._read())
+
+    async def _read(self) -> None:
+        try:
+            while chunk := await self.process.stdout.read(SAMPLE_RATE * 2):
+                await self.on_pcm(chunk)
+        except BaseException:
+            # Nothing drains ffmpeg's output any more; stop it so writes fail instead of blocking
+            self.kill()
+            raise
+
+    def kill(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+    async def write(self, data: bytes) -> None:
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+
+    async def close(self) -> None:
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        try:
+            await self._reader
+        finally:
+            # Reads whatever a killed ffmpeg left on stdout so its pipes close
+            await self.process.communicate()
+
+class StreamSession:
+    """One live stream: decoding, recording to `file_path` and incremental transcription."""
+
+    def __init__(self, start: schemas.StreamStart, file_path: str):
+        if start.encoding not in ("pcm_s16le", "opus"):
+            raise ValueError(f"Unsupported encoding: {start.encoding}")
+        self.start = start
+        self.file_path = file_path
+        self.window = SlidingWindow()
+        self.recorded = 0  # Samples written to the recording
+        self.audio_arrived = asyncio.Event()
+        self.error: Optional[Exception] = None  # Why the recording cannot be kept, e.g. it outgrew the size limit
+        self._remainder = b""
+        self._wav = None
+        needs_decoding = start.encoding == "opus" or start.sample_rate != SAMPLE_RATE or start.channels != 1
+        self._decoder = PCMDecoder(start, self._ingest) if needs_decoding else None
+
+    async def open(self) -> None:
+        self._wav = await executors.run_io(self._open_wav)
+        if self._decoder is not None:
+            await self._decoder.open()
+
+    def _open_wav(self):
+        wav = wave.open(self.file_path, "wb")
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        return wav
+
+    @property
+    def duration(self) -> float:
+        return self.recorded / SAMPLE_RATE
+
+    async def write(self, data: bytes) -> None:
+        if self.error is not None:
+            raise self.error
+        try:
+            if self._decoder is not None:
+                await self._decoder.write(data)
+            else:
+                await self._ingest(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The decoder was stopped because ingesting its output failed
+            if self.error is not None:
+                raise self.error
+            raise
+
+    async def _ingest(self, pcm: bytes) -> None:
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % 2
+        pcm, self._remainder = pcm[:usable], pcm[usable:]
+        if not pcm:
+            return
+        if (self.recorded + usable // 2) * 2 > settings.MAX_UPLOAD_FILE_MB * 2**20:
+            self.error = utils.UploadTooLarge(f"Stream exceeds the {settings.MAX_UPLOAD_FILE_MB} MB limit.")
+            raise self.error
+        await executors.run_io(self._wav.writeframesraw, pcm)
+        self.recorded += usable // 2
+        self.window.feed(np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0)
+        self.audio_arrived.set()
+
+    async def transcribe(self, final: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Run one pass over the window; returns the newly final and the partial segments."""
+        audio, offset = self.window.snapshot()
+        if len(audio) == 0:
+            return [], []
+        segments = await executors.run_cpu(transcribe_window, audio, self.start.language)
+        return self.window.advance(segments, offset, final=final)
+
+    async def finish(self) -> None:
+        """Flush the decoder and complete the recording."""
+        try:
+            if self._decoder is not None:
+                await self._decoder.close()
+        finally:
+            if self._wav is not None:
+                await executors.run_io(self._wav.close)
+                self._wav = None
@@ -0,0 +1,321 @@
+# app/summarizer.py
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from loguru import logger
+from sqlalchemy.exc import IntegrityError
+from .config import settings
+from . import database, executors, metrics, models
+
+summary_latency = metrics.histogram("summarizer_request_seconds", "Summarizer HTTP call latency, by outcome")
+summary_retries = metrics.counter("summarizer_retries_total", "Summarizer calls retried")
+chunk_cache_lookups = metrics.counter("summary_chunk_cache_total", "Chunk summary cache lookups, by result")
+circuit_open = metrics.gauge("summarizer_circuit_open", "1 while the summarizer circuit breaker is open")
+
+# Bump when the chunk text format changes, so cached chunk summaries are not reused
+CHUNK_FORMAT_VERSION = 1
+
+class SummarizationError(Exception):
+    """The summarizer could not produce a summary."""
+
+class CircuitOpen(SummarizationError):
+    """Calls are short-circuited after repeated failures."""
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets trial calls through after `reset_seconds`."""
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def check(self) -> None:
+        if self.state == "open":
+            raise CircuitOpen("Summarizer circuit is open.")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Summarizer circuit opened after {self.failures} failures.")
+            # A failed trial call in the half-open state re-opens the circuit
+            self.opened_at = time.monotonic()
+
+def _retryable(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+class SummarizerClient:
+    """
+    Async client for the summarization API: pooled connections, timeouts,
+    jittered exponential retries, a circuit breaker and a concurrency cap.
+    When SUMMARIZER_BATCH_URL is set, concurrent requests are coalesced into
+    batch calls of up to SUMMARIZER_BATCH_SIZE transcripts.
+    """
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(settings.SUMMARIZER_BREAKER_THRESHOLD, settings.SUMMARIZER_BREAKER_RESET_SECONDS)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {settings.GEMINI_API_KEY}", "Content-Type": "application/json"},
+                timeout=httpx.Timeout(settings.SUMMARIZER_TIMEOUT, connect=5.0),
+                limits=httpx.Limits(max_connections=settings.SUMMARIZER_CONCURRENCY, max_keepalive_connections=settings.SUMMARIZER_CONCURRENCY),
+            )
+            self._semaphore = asyncio.Semaphore(settings.SUMMARIZER_CONCURRENCY)
+        return self._client
+
+    async def _post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        client = self._http()
+        attempts = settings.SUMMARIZER_MAX_RETRIES + 1
+        for attempt in range(attempts):
+            self.breaker.check()
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    response = await client.post(url, json=payload)
+                if response.status_code == 200:
+                    summary_latency.observe(time.perf_counter() - started, outcome="ok")
+                    self.breaker.record_success()
+                    return response.json()
+                error = SummarizationError(f"Gemini API error: {response.status_code} - {response.text[:200]}")
+                retry = _retryable(response)
+            except httpx.TransportError as e:
+                error = SummarizationError(f"Gemini API unreachable: {e}")
+                retry = True
+            summary_latency.observe(time.perf_counter() - started, outcome="error")
+            self.breaker.record_failure()
+            if not retry or attempt == attempts - 1:
+                raise error
+            summary_retries.inc()
+            # Full jitter: sleep a random fraction of the exponential backoff
+            await asyncio.sleep(random.uniform(0, settings.SUMMARIZER_BACKOFF_SECONDS * 2 ** attempt))
+        raise SummarizationError("Summarization failed.")
+
+    async def summarize(self, text: str, language: str) -> str:
+        if settings.SUMMARIZER_BATCH_URL and settings.SUMMARIZER_BATCH_SIZE > 1:
+            if self._pending is None:
+                self._pending = asyncio.Queue()
+                self._batcher = asyncio.ensure_future(self._run_batcher())
+            future = asyncio.get_running_loop().create_future()
+            await self._pending.put(((text, language), future))
+            return await future
+        data = await self._post(settings.GEMINI_API_URL, {"text": text, "language": language})
+        summary = data.get("summary")
+        if not summary:
+            raise SummarizationError("No summary found in Gemini API response.")
+        return summary
+
+    async def _run_batcher(self) -> None:
+        while True:
+            batch: List[Tuple[Tuple[str, str], asyncio.Future]] = [await self._pending.get()]
+            deadline = time.monotonic() + settings.SUMMARIZER_BATCH_WAIT_MS / 1000
+            while len(batch) < settings.SUMMARIZER_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.ensure_future(self._send_batch(batch))
+
+    async def _send_batch(self, batch: List[Tuple[Tuple[str, str], asyncio.Future]]) -> None:
+        try:
+            data = await self._post(settings.SUMMARIZER_BATCH_URL, {
+                "items": [{"text": text, "language": language} for (text, language), _ in batch],
+            })
+            summaries = data.get("summaries") or []
+            if len(summaries) != len(batch):
+                raise SummarizationError(f"Expected {len(batch)} summaries, got {len(summaries)}.")
+            for (_, future), summary in zip(batch, summaries):
+                if not future.done():
+                    if summary:
+                        future.set_result(summary)
+                    else:
+                        future.set_exception(SummarizationError("No summary found in Gemini API response."))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def aclose(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+# Worker processes are synchronous; the client lives on a background event
+# loop so pooled connections and batching are shared across calls.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+client = SummarizerClient()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="summarizer-loop", daemon=True).start()
+        return _loop
+
+def submit(text: str, language: str) -> "Future[str]":
+    """Start summarizing `text` from synchronous code; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(client.summarize(text, language), _background_loop())
+
+def summarize(text: str, language: str) -> str:
+    """Blocking summarize call for synchronous callers."""
+    return submit(text, language).result()
+
+# Map-reduce over long transcripts
+
+def _turns(segments: List[Dict[str, Any]]) -> List[Tuple[float, str]]:
+    """Merge consecutive segments of the same speaker into (start, "speaker: text") turns."""
+    turns: List[Tuple[float, str, List[str]]] = []
+    for segment in segments:
+        text = segment.get("text", "").strip()
+        if not text:
+            continue
+        if turns and turns[-1][1] == segment.get("speaker"):
+            turns[-1][2].append(text)
+        else:
+            turns.append((segment.get("timestamp") or 0.0, segment.get("speaker"), [text]))
+    return [(start, f"{speaker}: {' '.join(texts)}") for start, speaker, texts in turns]
+
+def _pack(parts: List[str], max_chars: int) -> List[str]:
+    """Greedily join consecutive parts into texts of at most `max_chars`, at least two parts per text."""
+    packed: List[List[str]] = []
+    size = 0
+    for part in parts:
+        if packed and (len(packed[-1]) < 2 or size + len(part) + 1 <= max_chars):
+            packed[-1].append(part)
+            size += len(part) + 1
+        else:
+            packed.append([part])
+            size = len(part)
+    return ["\n".join(group) for group in packed]
+
+def chunk_transcript(transcript_data: Dict[str, Any], max_chars: int = None, window_seconds: float = None) -> List[str]:
+    """
+    Split a stored transcript into chunk texts on speaker-turn boundaries.
+    A new chunk starts at the first turn of every `window_seconds` window,
+    so editing one segment only changes the chunk it falls in; windows
+    longer than `max_chars` are split further between turns.
+    """
+    max_chars = max_chars or settings.SUMMARY_CHUNK_CHARS
+    window_seconds = window_seconds or settings.SUMMARY_CHUNK_SECONDS
+    windows: Dict[int, List[str]] = {}
+    for start, turn in _turns(transcript_data.get("transcript", [])):
+        windows.setdefault(int(start // window_seconds), []).append(turn)
+
+    chunks = []
+    for window in sorted(windows):
+        current: List[str] = []
+        size = 0
+        for turn in windows[window]:
+            # A single turn longer than a chunk is cut at word boundaries
+            while len(turn) > max_chars:
+                cut = turn.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                piece, turn = turn[:cut], turn[cut:].lstrip()
+                if current:
+                    chunks.append("\n".join(current))
+                    current, size = [], 0
+                chunks.append(piece)
+            if current and size + len(turn) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(turn)
+            size += len(turn) + 1
+        if current:
+            chunks.append("\n".join(current))
+    return chunks
+
+def chunk_key(text: str, language: str) -> str:
+    return hashlib.sha256(f"{CHUNK_FORMAT_VERSION}:{language}:{text}".encode()).hexdigest()
+
+def _load_cached(keys: List[str]) -> Dict[str, str]:
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.SummaryChunk).filter(models.SummaryChunk.key.in_(keys)).all()
+        return {row.key: row.summary for row in rows}
+    finally:
+        db.close()
+
+def _store_cached(summaries: Dict[str, str]) -> None:
+    db = database.SessionLocal()
+    try:
+        db.add_all(models.SummaryChunk(key=key, summary=summary) for key, summary in summaries.items())
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker summarized one of the chunks first; the cache is best-effort
+            db.rollback()
+    finally:
+        db.close()
+
+async def _summarize_all(texts: List[str], language: str) -> List[str]:
+    """Summarize texts concurrently, reusing cached summaries of identical texts."""
+    keys = [chunk_key(text, language) for text in texts]
+    cached = await executors.run_io(_load_cached, list(set(keys)))
+    chunk_cache_lookups.inc(sum(key in cached for key in keys), result="hit")
+    chunk_cache_lookups.inc(sum(key not in cached for key in keys), result="miss")
+
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    outcomes = await asyncio.gather(*(client.summarize(text, language) for text in missing.values()), return_exceptions=True)
+    fresh = {key: outcome for key, outcome in zip(missing, outcomes) if not isinstance(outcome, BaseException)}
+    if fresh:
+        # Keep what succeeded, so a retry only redoes the failed chunks
+        await executors.run_io(_store_cached, fresh)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    cached.update(fresh)
+    return [cached[key] for key in keys]
+
+async def summarize_transcript(transcript_data: Dict[str, Any], language: str) -> str:
+    """Summarize bounded chunks of a transcript concurrently, then reduce the chunk summaries to one."""
+    summaries = await _summarize_all(chunk_transcript(transcript_data), language)
+    if not summaries:
+        return ""
+    # Each reduce round at least halves the number of summaries
+    while len(summaries) > 1:
+        summaries = await _summarize_all(_pack(summaries, settings.SUMMARY_CHUNK_CHARS), language)
+    return summaries[0]
+
+def submit_transcript(transcript_data: Dict[str, Any], language: str) -> "Future[str]":
+    """Start summarizing a stored transcript from synchronous code; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(summarize_transcript(transcript_data, language), _background_loop())
+
+def close() -> None:
+    """Close pooled connections and stop the batcher."""
+    if _loop is not None:
+        asyncio.run_coroutine_threadsafe(client.aclose(), _loop).result()
+
+def stats() -> Dict[str, Any]:
+    return {"circuit": client.breaker.state, "consecutive_failures": client.breaker.failures}
+
+@metrics.register_collector
+def collect_summarizer_metrics() -> None:
+    circuit_open.set(1 if client.breaker.state == "open" else 0)
@@ -0,0 +1,67 @@
+# app/tracing.py
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from loguru import logger
+from .config import settings
+from . import metrics
+
+stage_seconds = metrics.histogram("pipeline_stage_seconds", "Time spent in each processing stage")
+
+# Spans are exported over OTLP when TRACING_ENABLED is set and the optional
+# opentelemetry-sdk and opentelemetry-exporter-otlp packages are installed;
+# otherwise `span` does nothing and `stage` only records its timing.
+_tracer = None
+
+def setup(service_name: str) -> None:
+    """Configure span export for this process."""
+    global _tracer
+    if not settings.TRACING_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("TRACING_ENABLED is set but the OpenTelemetry SDK is not installed; tracing is off.")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("audio-transcription")
+
+def carrier() -> Dict[str, str]:
+    """Context of the current span, for continuing the trace in a job worker."""
+    if _tracer is None:
+        return {}
+    from opentelemetry.propagate import inject
+    headers: Dict[str, str] = {}
+    inject(headers)
+    return headers
+
+@contextmanager
+def span(name: str, parent: Optional[Dict[str, str]] = None, **attributes) -> Iterator[None]:
+    """A tracing span; `parent` is a `carrier()` from another process."""
+    if _tracer is None:
+        yield
+        return
+    context = None
+    if parent:
+        from opentelemetry.propagate import extract
+        context = extract(parent)
+    attributes = {key: value for key, value in attributes.items() if isinstance(value, (str, int, float, bool))}
+    with _tracer.start_as_current_span(name, context=context, attributes=attributes):
+        yield
+
+@contextmanager
+def stage(name: str, parent: Optional[Dict[str, str]] = None, **attributes) -> Iterator[None]:
+    """Time a processing stage into pipeline_stage_seconds and trace it."""
+    started = time.perf_counter()
+    try:
+        with span(f"stage.{name}", parent, **attributes):
+            yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, stage=name)
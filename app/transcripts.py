@@ -0,0 +1,76 @@
+# app/transcripts.py
+
+import json
+import zlib
+from typing import Any, Dict, List
+from .config import settings
+
+# Transcripts are stored column-wise instead of as a list of
+# {"speaker", "timestamp", "text"} objects: a dictionary of speaker labels,
+# one speaker index per segment, timestamps as millisecond deltas from the
+# previous segment, and the texts. The encoded JSON is zlib-compressed when
+# that makes it smaller; the first byte of the blob says which. Rows written
+# before this format keep their transcript in `conversation_transcript`.
+FORMAT_VERSION = 1
+
+_RAW = b"j"
+_ZLIB = b"z"
+
+def encode(transcript_data: Dict[str, Any]) -> bytes:
+    """Compact form of a transcript in the format of `transcription.build_transcript`."""
+    speakers: Dict[str, int] = {}
+    indexes: List[int] = []
+    deltas: List[int] = []
+    texts: List[str] = []
+    previous = 0
+    for segment in transcript_data.get("transcript", []):
+        indexes.append(speakers.setdefault(segment["speaker"], len(speakers)))
+        milliseconds = int(round(segment["timestamp"] * 1000))
+        deltas.append(milliseconds - previous)
+        previous = milliseconds
+        texts.append(segment["text"])
+    document = {
+        "m": transcript_data.get("metadata", {}),
+        "s": list(speakers),
+        "k": indexes,
+        "t": deltas,
+        "x": texts,
+    }
+    raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if settings.TRANSCRIPT_COMPRESSION:
+        compressed = zlib.compress(raw, settings.TRANSCRIPT_COMPRESSION_LEVEL)
+        if len(compressed) < len(raw):
+            return _ZLIB + compressed
+    return _RAW + raw
+
+def expand(encoded: bytes, version: int = FORMAT_VERSION) -> Dict[str, Any]:
+    """Inverse of `encode`: the transcript as {"metadata", "transcript"}."""
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unknown transcript format version: {version}")
+    encoded = bytes(encoded)
+    marker, body = encoded[:1], encoded[1:]
+    if marker == _ZLIB:
+        body = zlib.decompress(body)
+    elif marker != _RAW:
+        raise ValueError("Corrupt transcript encoding")
+    document = json.loads(body)
+    speakers = document["s"]
+    transcript = []
+    milliseconds = 0
+    for index, delta, text in zip(document["k"], document["t"], document["x"]):
+        milliseconds += delta
+        transcript.append({"speaker": speakers[index], "timestamp": milliseconds / 1000, "text": text})
+    return {"metadata": document["m"], "transcript": transcript}
+
+def load(row) -> Dict[str, Any]:
+    """The transcript of a conversation row (or dict of its columns), from whichever of the stored forms it has."""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name, None)
+    if get("transcript_encoded") is not None:
+        return expand(get("transcript_encoded"), get("transcript_version"))
+    return get("conversation_transcript")
+
+def columns(transcript_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Conversation column values for storing `transcript_data`."""
+    if settings.TRANSCRIPT_STORAGE == "json":
+        return {"conversation_transcript": transcript_data, "transcript_encoded": None, "transcript_version": None}
+    return {"conversation_transcript": None, "transcript_encoded": encode(transcript_data), "transcript_version": FORMAT_VERSION}
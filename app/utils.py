@@ -1,30 +1,37 @@
 # app/utils.py
 
+import asyncio
+import base64
+import json
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from .config import settings
 import shutil
 import uuid
+import ffmpeg
+
+# Containers whose index may sit at the end of the file; ffmpeg needs to seek, so they cannot be read from a pipe
+SEEKABLE_EXTENSIONS = {"mp4", "m4a", "mov", "3gp", "3g2"}
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit."""
 
 def generate_file_path(metadata: Dict[str, Any], extension: str) -> str:
+    """
+    Path of a new recording: one directory per tenant and day, with the rest
+    of the call's identity in the file name (deep trees make listing and
+    backups slow). The part under RECORDS_PATH is the recording's storage key.
+    """
     tenant_id = metadata.get("tenant_id")
     call_start_timestamp = metadata.get("call_start_timestamp")
-    date_called = call_start_timestamp.date()
-    year = date_called.year
-    month = f"{date_called.month:02}"
-    day = f"{date_called.day:02}"
     extension_or_agent = metadata.get("representative_id")
     call_type = metadata.get("call_type", "inbound")  # default to inbound
 
     directory = os.path.join(
         settings.RECORDS_PATH,
         f"tenant_{tenant_id}",
-        str(year),
-        month,
-        day,
-        str(extension_or_agent),
-        call_type
+        call_start_timestamp.strftime("%Y-%m-%d"),
     )
     os.makedirs(directory, exist_ok=True)
 
@@ -32,10 +39,117 @@ def generate_file_path(metadata: Dict[str, Any], extension: str) -> str:
     caller = metadata.get("caller_phone_number")
     callee = metadata.get("callee_phone_number")
     call_id = metadata.get("call_id")
-    filename = f"{timestamp}_{caller}_{callee}_{extension_or_agent}_{call_id}.{extension}"
+    filename = f"{timestamp}_{caller}_{callee}_{extension_or_agent}_{call_type}_{call_id}.{extension}"
 
     return os.path.join(directory, filename)
 
+def convert_audio(input_path: str, output_path: str) -> None:
+    """Convert audio to WAV format with specific parameters."""
+    try:
+        (
+            ffmpeg
+            .input(input_path)
+            .output(output_path, format='wav', acodec='pcm_s16le', ac=1, ar='16k')
+            .overwrite_output()
+            .run(quiet=True)
+        )
+    except ffmpeg.Error as e:
+        raise Exception(f"Error converting audio: {e}")
+
+async def stream_convert_audio(file, extension: str, output_path: str, digest=None) -> int:
+    """
+    Stream an upload in chunks into ffmpeg, writing the 16 kHz mono WAV at
+    `output_path` in a single pass. Each chunk is also fed to `digest` (a
+    hashlib object), if given. Returns the number of bytes received.
+    """
+    max_bytes = settings.MAX_UPLOAD_FILE_MB * 2**20
+    if extension.lower() in SEEKABLE_EXTENSIONS:
+        source = os.path.join(settings.UPLOAD_TMP_PATH, f"{uuid.uuid4()}.{extension}")
+    else:
+        source = "pipe:0"
+
+    received = 0
+    process = None
+    try:
+        if source != "pipe:0":
+            with open(source, "wb") as buffer:
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise UploadTooLarge(f"File exceeds the {settings.MAX_UPLOAD_FILE_MB} MB limit.")
+                    if digest is not None:
+                        digest.update(chunk)
+                    buffer.write(chunk)
+
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", source,
+            "-ac", "1", "-ar", "16000", "-acodec", "pcm_s16le", "-f", "wav", output_path,
+            stdin=asyncio.subprocess.PIPE if source == "pipe:0" else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        errors = asyncio.ensure_future(process.stderr.read())
+        if source == "pipe:0":
+            try:
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise UploadTooLarge(f"File exceeds the {settings.MAX_UPLOAD_FILE_MB} MB limit.")
+                    if digest is not None:
+                        digest.update(chunk)
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg exited early; its stderr explains why
+        if await process.wait() != 0:
+            raise Exception(f"Error converting audio: {(await errors).decode(errors='replace').strip()}")
+        return received
+    except BaseException:
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        if source != "pipe:0" and os.path.exists(source):
+            os.remove(source)
+
+def encode_cursor(call_start_timestamp: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for the conversations listing and search."""
+    raw = json.dumps([call_start_timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`; raises ValueError on malformed input."""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def parse_range(header: str, size: int) -> Tuple[int, int]:
+    """
+    Byte range [start, end) of a single-range HTTP Range header for a
+    resource of `size` bytes; raises ValueError if it is malformed or unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {header}")
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start, end = int(first), min(int(last) + 1, size) if last else size
+    except ValueError:
+        raise ValueError(f"Invalid range: {header}")
+    if start >= end:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
 def save_file(file, path: str):
     with open(path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
@@ -0,0 +1,7 @@
+# app/worker.py
+
+from . import jobs
+
+if __name__ == "__main__":
+    # Standalone worker for the database job backend: python -m app.worker
+    jobs.run_database_worker()
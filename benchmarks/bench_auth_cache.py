@@ -0,0 +1,55 @@
+# benchmarks/bench_auth_cache.py
+"""
+Requests/sec on GET /conversations with the principal cache on and off.
+
+    python -m benchmarks.bench_auth_cache --requests 2000
+
+Runs in-process against a throwaway SQLite database (DATABASE_URL is
+overridden) and also reports SQL statements issued per request.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+    os.environ.update(DATABASE_URL=f"sqlite:///{database_path}", AUTO_CREATE_TABLES="true", JOB_WORKERS="0", ENABLE_LOGS="false")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app import auth, config, database, main as api
+    from app.cache import TTLCache
+    from app.create_user import create_user
+
+    create_user("bench", "bench-password")
+    statements = {"count": 0}
+    event.listen(database.engine, "before_cursor_execute", lambda *a, **k: statements.__setitem__("count", statements["count"] + 1))
+
+    results = {}
+    with TestClient(api.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": "bench-password"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for label, ttl in (("cache_off", 0), ("cache_on", config.settings.PRINCIPAL_CACHE_TTL_SECONDS or 60)):
+            auth.principal_cache = TTLCache(ttl, config.settings.PRINCIPAL_CACHE_SIZE)
+            client.get("/conversations", headers=headers)
+            statements["count"] = 0
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                client.get("/conversations", headers=headers).raise_for_status()
+            elapsed = time.perf_counter() - started
+            results[label] = {
+                "requests_per_second": round(args.requests / elapsed, 1),
+                "statements_per_request": round(statements["count"] / args.requests, 2),
+            }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
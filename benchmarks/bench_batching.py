@@ -0,0 +1,53 @@
+# benchmarks/bench_batching.py
+"""
+Compare per-file transcription with cross-file batched transcription.
+
+    python -m benchmarks.bench_batching call1.wav call2.wav ... [--language he] [--batch-size 16]
+
+Input files should be 16 kHz mono WAVs (as produced by the ingest path).
+Reports throughput in audio-seconds per wall-second for both paths.
+"""
+
+import argparse
+import json
+import time
+import wave
+
+from app import audio, batching, transcription
+
+def audio_seconds(path: str) -> float:
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--language", default="he")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    total_audio = sum(audio_seconds(path) for path in args.files)
+    signals = [audio.load_audio(path) for path in args.files]
+
+    # Warm up so model loading is excluded from both measurements
+    transcription.transcribe(signals[0], language=args.language)
+
+    started = time.perf_counter()
+    for signal in signals:
+        transcription.transcribe(signal, language=args.language)
+    per_file = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batching.transcribe_batch([(signal, args.language) for signal in signals], batch_size=args.batch_size)
+    batched = time.perf_counter() - started
+
+    print(json.dumps({
+        "files": len(args.files),
+        "audio_seconds": round(total_audio, 2),
+        "per_file": {"wall_seconds": round(per_file, 2), "audio_seconds_per_second": round(total_audio / per_file, 2)},
+        "batched": {"wall_seconds": round(batched, 2), "audio_seconds_per_second": round(total_audio / batched, 2)},
+        "speedup": round(per_file / batched, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
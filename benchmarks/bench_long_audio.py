@@ -0,0 +1,69 @@
+# benchmarks/bench_long_audio.py
+"""
+Wall-clock scaling of chunked long-recording transcription with the
+number of pool processes, on CPU.
+
+    python -m benchmarks.bench_long_audio call_90min.wav --workers 1 2 4 8 [--language he]
+
+The input should be a 16 kHz mono WAV (as produced by the ingest path).
+Each worker count starts a fresh pool and is warmed up on a short slice
+first, so model loading is excluded. Text agreement with the single-process
+whole-file transcription checks that stitching loses or repeats nothing.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import time
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--language", default="he")
+    parser.add_argument("--chunk-seconds", type=float, default=300)
+    args = parser.parse_args()
+
+    os.environ.update(WHISPER_DEVICE="cpu", TRANSCRIBE_CHUNK_SECONDS=str(args.chunk_seconds))
+    from app import audio, chunking, transcription
+    from app.config import settings
+
+    signal = audio.load_audio(args.file)
+    duration = len(signal) / audio.SAMPLE_RATE
+
+    def text_of(result):
+        return " ".join(segment["text"].strip() for segment in result["segments"])
+
+    transcription.transcribe(signal[: audio.SAMPLE_RATE * 30], language=args.language)
+    started = time.perf_counter()
+    reference = text_of(transcription.transcribe(signal, language=args.language))
+    whole_file = time.perf_counter() - started
+
+    runs = {}
+    for workers in args.workers:
+        warm_up = [chunking.get_pool(workers).submit(chunking._transcribe_chunk, args.file, 0.0, 5.0, args.language, 1) for _ in range(workers)]
+        for future in warm_up:
+            future.result()
+        started = time.perf_counter()
+        result = chunking.transcribe_long(args.file, signal, args.language, workers=workers)
+        elapsed = time.perf_counter() - started
+        runs[workers] = {
+            "wall_seconds": round(elapsed, 2),
+            "real_time_factor": round(elapsed / duration, 4),
+            "speedup_vs_whole_file": round(whole_file / elapsed, 2),
+            "segments": len(result["segments"]),
+            "text_agreement": round(difflib.SequenceMatcher(None, reference, text_of(result), autojunk=False).ratio(), 4),
+        }
+    chunking.shutdown()
+
+    print(json.dumps({
+        "audio_seconds": round(duration, 1),
+        "cpu_count": os.cpu_count(),
+        "chunks": len(chunking.plan_chunks(signal, settings.TRANSCRIBE_CHUNK_SECONDS, settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS)),
+        "whole_file": {"wall_seconds": round(whole_file, 2), "real_time_factor": round(whole_file / duration, 4)},
+        "chunked": runs,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
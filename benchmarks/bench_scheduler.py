@@ -0,0 +1,173 @@
+# benchmarks/bench_scheduler.py
+"""
+Discrete-event simulation of the job scheduler under a skewed tenant load:
+one tenant bulk-uploads a backfill of thousands of calls at once while
+other tenants upload calls as they happen. Compares the claim orders
+(first-in first-out, as before fair scheduling, against the fair queue of
+app/scheduler.py with and without the backfill marked as such, and with the
+heavy tenant held to a per-key rate limit) by the queue wait and
+completion latency of each group of tenants. Jobs still waiting when the
+simulation ends count with their wait so far.
+
+    python -m benchmarks.bench_scheduler
+    python -m benchmarks.bench_scheduler --workers 8 --backfill 10000 --light-tenants 20 --hours 4
+
+Workers take one job at a time and spend --rtf seconds per second of audio.
+Nothing runs for real, so the simulation covers hours of load in seconds.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import random
+import statistics
+from collections import deque
+
+HEAVY = 1
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"jobs": 0}
+    ordered = sorted(values)
+    pick = lambda fraction: round(ordered[int(fraction * (len(ordered) - 1))], 1)
+    return {"jobs": len(values), "p50_s": pick(0.5), "p95_s": pick(0.95), "p99_s": pick(0.99), "max_s": round(ordered[-1], 1)}
+
+class FifoQueue:
+    """Claim order before fair scheduling: oldest first."""
+
+    def __init__(self):
+        self._items = deque()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def push(self, item, tenant_id, priority, cost) -> None:
+        self._items.append(item)
+
+    def pop(self):
+        return self._items.popleft(), None, None
+
+def workload(args, rng: random.Random):
+    """Uploads as (time, tenant_id, audio seconds), sorted by time."""
+    duration = lambda: min(max(rng.lognormvariate(5.3, 0.8), 20.0), 3600.0)  # Median ~3.3 minutes
+    uploads = [(rng.uniform(0, 60), HEAVY, duration()) for _ in range(args.backfill)]
+    for tenant_id in range(HEAVY + 1, HEAVY + 1 + args.light_tenants):
+        time = rng.expovariate(args.light_rate / 3600)
+        while time < args.hours * 3600:
+            uploads.append((time, tenant_id, duration()))
+            time += rng.expovariate(args.light_rate / 3600)
+    return sorted(uploads)
+
+def simulate(args, uploads, queue, backfill_priority: str, rate_limit: float = 0.0) -> dict:
+    from app.scheduler import TokenBucket
+
+    events = []  # (time, sequence, kind, job)
+    sequence = 0
+    def schedule(time, kind, job):
+        nonlocal sequence
+        heapq.heappush(events, (time, sequence, kind, job))
+        sequence += 1
+
+    for index, (time, tenant_id, seconds) in enumerate(uploads):
+        schedule(time, "upload", {"id": index, "tenant": tenant_id, "seconds": seconds, "uploaded": time})
+    bucket, backlog = None, deque()
+    if rate_limit:
+        bucket = TokenBucket(rate_limit / 60, args.burst)
+        bucket.updated = 0.0
+    idle, horizon = args.workers, args.hours * 3600
+    waits, latencies, rejected, processed = {"heavy": [], "light": []}, {"heavy": [], "light": []}, 0, {"heavy": 0.0, "light": 0.0}
+    queued = {}
+
+    def start(now):
+        nonlocal idle
+        while idle and len(queue):
+            job, _, _ = queue.pop()
+            del queued[job["id"]]
+            idle -= 1
+            waits["heavy" if job["tenant"] == HEAVY else "light"].append(now - job["uploaded"])
+            schedule(now + job["seconds"] * args.rtf, "done", job)
+
+    while events:
+        now, _, kind, job = heapq.heappop(events)
+        if now > horizon:
+            break
+        group = "heavy" if job is not None and job["tenant"] == HEAVY else "light"
+        if kind == "upload" and bucket is not None and job["tenant"] == HEAVY:
+            # The backfill client uploads one file at a time and honours Retry-After
+            backlog.append(job)
+            if len(backlog) == 1:
+                schedule(now, "retry", None)
+            continue
+        if kind == "retry":
+            wait = bucket.take(1, now=now)
+            if wait:
+                rejected += 1
+                schedule(now + math.ceil(wait), "retry", None)  # Retry-After is whole seconds
+                continue
+            job = backlog.popleft()
+            if backlog:
+                schedule(now, "retry", None)
+        if kind in ("upload", "retry"):
+            priority = backfill_priority if job["tenant"] == HEAVY else "live"
+            queue.push(job, job["tenant"], priority, job["seconds"])
+            queued[job["id"]] = job
+        else:
+            idle += 1
+            latencies[group].append(now - job["uploaded"])
+            processed[group] += job["seconds"]
+        start(now)
+
+    # Jobs still queued at the end count with the wait so far, a lower bound
+    unserved = {"heavy": 0, "light": 0}
+    for job in queued.values():
+        group = "heavy" if job["tenant"] == HEAVY else "light"
+        unserved[group] += 1
+        waits[group].append(horizon - job["uploaded"])
+    return {
+        "light_unserved": unserved["light"],
+        "light_wait": percentiles(waits["light"]),
+        "light_completion": percentiles(latencies["light"]),
+        "heavy_wait": percentiles(waits["heavy"]),
+        "heavy_completed": len(latencies["heavy"]),
+        "heavy_queued_at_end": unserved["heavy"],
+        "heavy_not_yet_admitted": len(backlog),
+        "audio_hours_processed": {group: round(seconds / 3600, 1) for group, seconds in processed.items()},
+        "uploads_rate_limited": rejected,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rtf", type=float, default=0.1, help="Processing seconds per second of audio")
+    parser.add_argument("--backfill", type=int, default=3000, help="Calls the heavy tenant uploads in the first minute")
+    parser.add_argument("--light-tenants", type=int, default=9)
+    parser.add_argument("--light-rate", type=float, default=30.0, help="Calls per hour of each light tenant")
+    parser.add_argument("--hours", type=float, default=2.0, help="Simulated time")
+    parser.add_argument("--rate-limit", type=float, default=4.0, help="Files per minute allowed to the heavy tenant's key")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.scheduler import FairQueue
+
+    uploads = workload(args, random.Random(args.seed))
+    light_seconds = [seconds for _, tenant_id, seconds in uploads if tenant_id != HEAVY]
+    capacity = args.workers / args.rtf
+    results = {
+        "fifo": simulate(args, uploads, FifoQueue(), "live"),
+        "fair": simulate(args, uploads, FairQueue(weights={}), "live"),
+        "fair_backfill_priority": simulate(args, uploads, FairQueue(weights={}), "backfill"),
+        "fair_rate_limited": simulate(args, uploads, FairQueue(weights={}), "live", rate_limit=args.rate_limit),
+    }
+    print(json.dumps({
+        "workers": args.workers,
+        "capacity_audio_seconds_per_second": round(capacity, 1),
+        "light_utilization": round(sum(light_seconds) / (args.hours * 3600) / capacity, 2),
+        "light_median_call_s": round(statistics.median(light_seconds), 1),
+        "backfill_audio_hours": round(sum(seconds for _, tenant_id, seconds in uploads if tenant_id == HEAVY) / 3600, 1),
+        "policies": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
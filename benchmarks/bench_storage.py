@@ -0,0 +1,114 @@
+# benchmarks/bench_storage.py
+"""
+Recording storage costs per codec: size against the 16 kHz PCM WAV,
+transcode time, and range-read latency on the local backend and on an
+object store (benchmarks/fake_object_store.py with a simulated round trip).
+Each codec's seek index is checked by splicing the codec headers onto the
+stream from a seek point in the middle of the call and decoding it.
+
+    python -m benchmarks.bench_storage --seconds 60 600 --codecs opus flac wav
+    python -m benchmarks.bench_storage --seconds 1800 --latency-ms 30 --reads 500
+
+Needs ffmpeg with libopus. Audio is synthetic speech-like noise, which
+compresses worse than real calls (no silence between turns is truly silent
+in real recordings either, so treat the ratios as a rough guide).
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+def percentile(values, fraction: float) -> float:
+    return sorted(values)[int(fraction * (len(values) - 1))]
+
+def decoded_seconds(data: bytes) -> float:
+    """Seconds of audio ffmpeg decodes from `data`."""
+    process = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "16000", "pipe:1"],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    return len(process.stdout) / 32000
+
+def read_latencies(backend, key: str, size: int, reads: int, read_bytes: int, rng: random.Random) -> dict:
+    timings = []
+    for _ in range(reads):
+        start = rng.randrange(0, max(size - read_bytes, 1))
+        started = time.perf_counter()
+        data = b"".join(backend.read(key, start, start + read_bytes))
+        timings.append((time.perf_counter() - started) * 1000)
+        assert len(data) == min(read_bytes, size - start)
+    return {"median_ms": round(statistics.median(timings), 3), "p95_ms": round(percentile(timings, 0.95), 3)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[60, 600], help="Recording durations to test")
+    parser.add_argument("--codecs", nargs="+", default=["opus", "flac", "wav"])
+    parser.add_argument("--reads", type=int, default=200, help="Range reads per backend")
+    parser.add_argument("--read-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated object store round trip")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    os.environ.update(RECORDS_PATH=os.path.join(root, "records"), STORAGE_BACKEND="local", ENABLE_LOGS="false")
+
+    from app import storage
+    from benchmarks.fake_object_store import LocalObjectClient
+    from benchmarks.synthetic_audio import speech_like, wav_bytes
+
+    rng = random.Random(5)
+    results = []
+    try:
+        for seconds in args.seconds:
+            pcm = wav_bytes(speech_like(seconds, seed=int(seconds)))
+            for codec in args.codecs:
+                for name, backend in (
+                    ("local", storage.LocalStorage(os.environ["RECORDS_PATH"])),
+                    ("object", storage.ObjectStorage(LocalObjectClient(os.path.join(root, "bucket"), args.latency_ms), "recordings")),
+                ):
+                    storage._backend = backend
+                    source = os.path.join(os.environ["RECORDS_PATH"], "tenant_1", "2024-01-01", f"call_{int(seconds)}_{codec}_{name}.wav")
+                    os.makedirs(os.path.dirname(source), exist_ok=True)
+                    with open(source, "wb") as f:
+                        f.write(pcm)
+                    started = time.perf_counter()
+                    details = storage.archive(source, seconds, codec)
+                    archive_seconds = time.perf_counter() - started
+                    key, size = details["key"], details["bytes"]
+
+                    # Play from the middle of the call: codec headers, then the stream from the seek point
+                    middle = seconds / 2
+                    offset = storage.seek_offset(details, middle)
+                    position = max(p for p, byte_offset in details["seek_index"] if byte_offset == offset)
+                    spliced = b"".join(backend.read(key, 0, details["data_offset"])) + b"".join(backend.read(key, offset, size))
+
+                    results.append({
+                        "seconds": seconds,
+                        "codec": codec,
+                        "backend": name,
+                        "bytes": size,
+                        "size_vs_pcm": round(size / len(pcm), 3),
+                        "archive_ms": round(archive_seconds * 1000, 1),
+                        "transcode_x_realtime": round(seconds / archive_seconds, 1),
+                        "seek_points": len(details["seek_index"]),
+                        "seek_from_s": position,
+                        "seek_decoded_s": round(decoded_seconds(spliced), 2),
+                        "seek_expected_s": round(seconds - position, 2),
+                        "range_read": read_latencies(backend, key, size, args.reads, args.read_bytes, rng),
+                    })
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(json.dumps({
+        "read_bytes": args.read_bytes,
+        "object_latency_ms": args.latency_ms,
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
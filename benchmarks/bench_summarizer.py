@@ -0,0 +1,69 @@
+# benchmarks/bench_summarizer.py
+"""
+Summaries/sec through the summarizer client against the local fake server:
+the old one-request-per-file loop versus the pooled client, with and
+without batching, and how it behaves under injected failures.
+
+    python -m benchmarks.bench_summarizer --transcripts 64 --latency-ms 200 --failure-rate 0.1
+"""
+
+import argparse
+import json
+import os
+import time
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcripts", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    from benchmarks.fake_summarizer import FakeSummarizer
+    server = FakeSummarizer(("127.0.0.1", 0), args.latency_ms, failure_rate=args.failure_rate).start()
+    os.environ.update(GEMINI_API_URL=f"{server.url}/summarize", SUMMARIZER_BACKOFF_SECONDS="0.05", ENABLE_LOGS="false")
+
+    import requests
+    from app import summarizer
+    from app.config import settings
+
+    texts = [f"שיחה מספר {index} " + "מילה " * 500 for index in range(args.transcripts)]
+
+    def sequential():
+        # What summarize_transcript used to do: one unpooled, unretried call per file
+        ok = 0
+        for text in texts:
+            response = requests.post(settings.GEMINI_API_URL, json={"text": text, "language": "he"})
+            ok += response.status_code == 200
+        return ok
+
+    def pooled(batch_url: str):
+        settings.SUMMARIZER_BATCH_URL = batch_url
+        summarizer.client.breaker.record_success()
+        futures = [summarizer.submit(text, "he") for text in texts]
+        ok = 0
+        for future in futures:
+            try:
+                future.result()
+                ok += 1
+            except Exception:
+                pass
+        return ok
+
+    results = {}
+    for name, run in (("sequential", sequential), ("pooled", lambda: pooled("")), ("pooled_batched", lambda: pooled(f"{server.url}/batch"))):
+        calls_before = dict(server.calls)
+        started = time.perf_counter()
+        ok = run()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "seconds": round(elapsed, 3),
+            "summaries_per_second": round(args.transcripts / elapsed, 1),
+            "succeeded": ok,
+            "http_calls": sum(server.calls.values()) - sum(calls_before.values()),
+        }
+    summarizer.close()
+    print(json.dumps({"transcripts": args.transcripts, "latency_ms": args.latency_ms, "failure_rate": args.failure_rate, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/fake_object_store.py
+"""
+Local stand-in for an S3 client: the subset of boto3's S3 client that
+app/storage.py's ObjectStorage uses, storing objects as files under a
+directory, with an optional per-request latency to mimic a remote store.
+
+    from benchmarks.fake_object_store import LocalObjectClient
+    backend = storage.ObjectStorage(LocalObjectClient("/tmp/bucket", latency_ms=20), "recordings")
+"""
+
+import io
+import os
+import threading
+import time
+
+class NoSuchKey(Exception):
+    """Raised like botocore's ClientError for a missing object."""
+
+    def __init__(self, key: str):
+        super().__init__(f"NoSuchKey: {key}")
+        self.response = {"Error": {"Code": "NoSuchKey"}}
+
+class LocalObjectClient:
+    def __init__(self, root: str, latency_ms: float = 0.0):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.calls = {"put_object": 0, "get_object": 0, "head_object": 0, "delete_object": 0}
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, bucket: str, key: str) -> str:
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def put_object(self, Bucket: str, Key: str, Body) -> dict:
+        path = self._request("put_object", Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body if isinstance(Body, bytes) else Body.read())
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None) -> dict:
+        path = self._request("get_object", Bucket, Key)
+        if not os.path.exists(path):
+            raise NoSuchKey(Key)
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        if Range:
+            first, _, last = Range.split("=", 1)[1].partition("-")
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+        return {"Body": io.BytesIO(data), "ContentLength": len(data), "ContentRange": f"bytes {start}-{end}/{size}"}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        path = self._request("head_object", Bucket, Key)
+        if not os.path.exists(path):
+            raise NoSuchKey(Key)
+        return {"ContentLength": os.path.getsize(path)}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        path = self._request("delete_object", Bucket, Key)
+        if os.path.exists(path):
+            os.remove(path)
+        return {}
@@ -0,0 +1,87 @@
+# benchmarks/fake_summarizer.py
+"""
+Local stand-in for the summarization API, with configurable latency and
+failure rate. Serves the single-transcript endpoint on /summarize and the
+batch endpoint on /batch.
+
+    python -m benchmarks.fake_summarizer --port 8765 --latency-ms 500 --failure-rate 0.1
+
+Point the app at it with
+GEMINI_API_URL=http://127.0.0.1:8765/summarize and, to batch,
+SUMMARIZER_BATCH_URL=http://127.0.0.1:8765/batch.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def summary_of(item: dict) -> str:
+    words = item.get("text", "").split()
+    return " ".join(words[:20]) or "(empty)"
+
+class FakeSummarizer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 0.0, batch_latency_ms: float = None, failure_rate: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        # A batch call typically costs a bit more than one item, far less than N items
+        self.batch_latency_ms = latency_ms * 1.5 if batch_latency_ms is None else batch_latency_ms
+        self.failure_rate = failure_rate
+        self.calls = {"/summarize": 0, "/batch": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeSummarizer":
+        threading.Thread(target=self.serve_forever, name="fake-summarizer", daemon=True).start()
+        return self
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeSummarizer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path not in self.server.calls:
+            return self._reply(404, {"error": "not found"})
+        with self.server._lock:
+            self.server.calls[self.path] += 1
+        latency = self.server.batch_latency_ms if self.path == "/batch" else self.server.latency_ms
+        time.sleep(latency / 1000)
+        if random.random() < self.server.failure_rate:
+            return self._reply(503, {"error": "unavailable"})
+        if self.path == "/batch":
+            return self._reply(200, {"summaries": [summary_of(item) for item in payload.get("items", [])]})
+        return self._reply(200, {"summary": summary_of(payload)})
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--batch-latency-ms", type=float, default=None)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeSummarizer((args.host, args.port), args.latency_ms, args.batch_latency_ms, args.failure_rate)
+    print(f"Fake summarizer listening on {server.url}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
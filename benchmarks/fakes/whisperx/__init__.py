@@ -0,0 +1,98 @@
+# benchmarks/fakes/whisperx/__init__.py
+"""
+Deterministic stand-in for the parts of whisperx the pipeline uses, for
+benchmarks that measure everything around the model. Put benchmarks/fakes
+first on sys.path to use it. Latency scales with the audio length:
+
+    FAKE_WHISPERX_RTF          model seconds per audio second for transcribe (default 0.05)
+    FAKE_WHISPERX_ALIGN_RTF    same for alignment (default 0.01)
+    FAKE_WHISPERX_DIARIZE_RTF  same for diarization (default 0.02)
+    FAKE_WHISPERX_LOAD_SECONDS time to "load" a model (default 0)
+
+The text of each 5-second block is derived from a hash of its samples, so
+the same audio always yields the same transcript.
+"""
+
+import hashlib
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SEGMENT_SECONDS = 5.0
+WORDS = ["שלום", "תודה", "בבקשה", "לקוח", "שירות", "חשבון", "הזמנה", "משלוח", "בעיה", "פתרון", "מחר", "כתובת"]
+
+def _rate(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+def _work(audio: np.ndarray, variable: str, default: float) -> None:
+    time.sleep(len(audio) / SAMPLE_RATE * _rate(variable, default))
+
+def _segments(audio: np.ndarray) -> List[Dict[str, Any]]:
+    segments = []
+    step = int(SEGMENT_SECONDS * SAMPLE_RATE)
+    for offset in range(0, len(audio), step):
+        block = np.ascontiguousarray(audio[offset:offset + step])
+        if len(block) < SAMPLE_RATE // 4 or float(np.abs(block).max(initial=0.0)) < 1e-3:
+            continue  # Silence, as VAD would drop it
+        seed = int.from_bytes(hashlib.sha256(block.tobytes()).digest()[:4], "little")
+        rng = np.random.default_rng(seed)
+        start = offset / SAMPLE_RATE
+        segments.append({
+            "start": round(start, 3),
+            "end": round(start + len(block) / SAMPLE_RATE, 3),
+            "text": " ".join(rng.choice(WORDS, size=int(rng.integers(4, 10)))),
+        })
+    return segments
+
+class FakeWhisperModel:
+    def transcribe(self, audio: np.ndarray, language: str = None, batch_size: int = None, **kwargs) -> Dict[str, Any]:
+        _work(audio, "FAKE_WHISPERX_RTF", 0.05)
+        return {"segments": _segments(audio), "language": language}
+
+def load_model(whisper_arch: str, device: str = "cpu", compute_type: str = None, **kwargs) -> FakeWhisperModel:
+    time.sleep(_rate("FAKE_WHISPERX_LOAD_SECONDS", 0.0))
+    return FakeWhisperModel()
+
+def load_align_model(language_code: str, device: str = "cpu", **kwargs):
+    return object(), {"language": language_code}
+
+def align(segments: List[Dict[str, Any]], model, metadata, audio: np.ndarray, device: str = "cpu", **kwargs) -> Dict[str, Any]:
+    _work(audio, "FAKE_WHISPERX_ALIGN_RTF", 0.01)
+    aligned = []
+    for segment in segments:
+        words = segment["text"].split()
+        width = (segment["end"] - segment["start"]) / max(1, len(words))
+        aligned.append({
+            **segment,
+            "words": [
+                {"word": word, "start": round(segment["start"] + i * width, 3), "end": round(segment["start"] + (i + 1) * width, 3)}
+                for i, word in enumerate(words)
+            ],
+        })
+    return {"segments": aligned, "word_segments": [word for segment in aligned for word in segment["words"]]}
+
+class DiarizationPipeline:
+    def __init__(self, use_auth_token: str = None, device: str = "cpu", **kwargs):
+        time.sleep(_rate("FAKE_WHISPERX_LOAD_SECONDS", 0.0))
+
+    def __call__(self, audio: np.ndarray, **kwargs) -> List[Dict[str, Any]]:
+        _work(audio, "FAKE_WHISPERX_DIARIZE_RTF", 0.02)
+        # Speakers alternate every segment
+        step = SEGMENT_SECONDS
+        duration = len(audio) / SAMPLE_RATE
+        return [
+            {"start": start, "end": min(duration, start + step), "speaker": f"SPEAKER_{index % 2:02d}"}
+            for index, start in enumerate(np.arange(0.0, duration, step))
+        ]
+
+def assign_word_speakers(diarize_segments: List[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, Any]:
+    for segment in result["segments"]:
+        middle = (segment["start"] + segment["end"]) / 2
+        for turn in diarize_segments:
+            if turn["start"] <= middle < turn["end"]:
+                segment["speaker"] = turn["speaker"]
+                break
+    return result
@@ -0,0 +1,43 @@
+# benchmarks/synthetic_audio.py
+"""Synthetic 16 kHz test audio: tones and speech-like noise, without any TTS."""
+
+import io
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+def tone(seconds: float, frequency: float = 440.0, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def speech_like(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Noise shaped like conversation: a syllable-rate (~4 Hz) envelope over
+    voice-band noise, in utterances of 1-6 s separated by 0.3-1.5 s pauses.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    signal = np.zeros(total, dtype=np.float32)
+    position = 0
+    while position < total:
+        length = min(total - position, int(rng.uniform(1.0, 6.0) * SAMPLE_RATE))
+        t = np.arange(length) / SAMPLE_RATE
+        noise = rng.normal(0.0, 1.0, length)
+        # Crude voice band: difference of moving averages keeps roughly 300-3000 Hz
+        voiced = np.convolve(noise, np.ones(3) / 3, mode="same") - np.convolve(noise, np.ones(27) / 27, mode="same")
+        envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3.0, 5.0) * t + rng.uniform(0, np.pi)), 0.0, None)
+        signal[position:position + length] = (0.3 * voiced * envelope).astype(np.float32)
+        position += length + int(rng.uniform(0.3, 1.5) * SAMPLE_RATE)
+    return np.clip(signal, -1.0, 1.0)
+
+def wav_bytes(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """16-bit mono PCM WAV of `samples` in [-1, 1]."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,97 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Databases created before migrations were introduced already have these
+tables; mark them with `alembic stamp 0001` and then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from app import models
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "conversations_test",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", models.GUID(), nullable=False),
+        sa.Column("insent_timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("call_id", sa.String(255)),
+        sa.Column("callee_phone_number", sa.String(255)),
+        sa.Column("caller_phone_number", sa.String(255)),
+        sa.Column("call_start_timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("call_end_timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("call_duration", sa.Integer()),
+        sa.Column("customer_id", sa.String(255)),
+        sa.Column("customer_details", sa.JSON()),
+        sa.Column("call_project_id", sa.String(255)),
+        sa.Column("call_project_details", sa.JSON()),
+        sa.Column("crm_date", sa.JSON()),
+        sa.Column("representative_id", sa.String(255), nullable=False),
+        sa.Column("representative_name", sa.String(255), nullable=False),
+        sa.Column("representative_details", sa.JSON()),
+        sa.Column("conversation_transcript", sa.JSON(), nullable=False),
+        sa.Column("conversation_summary", sa.String(255)),
+        sa.Column("tags", models.StringArray),
+        sa.Column("sentiment", sa.JSON()),
+        sa.Column("resolution_status", sa.String(50)),
+        sa.Column("audio_file_id", sa.String(255)),
+        sa.Column("audio_file_details", sa.JSON()),
+        sa.Column("language", sa.String(50)),
+        sa.Column("analytics", sa.JSON()),
+        sa.UniqueConstraint("conversation_id", name="conversations_conversation_test_id_key"),
+    )
+    op.create_index("ix_conversations_test_id", "conversations_test", ["id"])
+
+    op.create_table(
+        "api_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+    )
+    op.create_index("ix_api_keys_id", "api_keys", ["id"])
+    op.create_index("ix_api_keys_username", "api_keys", ["username"], unique=True)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", models.GUID(), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("stage", sa.String(50)),
+        sa.Column("progress", sa.Float(), nullable=False),
+        sa.Column("stages", sa.JSON()),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("result", sa.JSON()),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+
+    op.create_table(
+        "audio_fingerprints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("language", sa.String(50), nullable=False),
+        sa.Column("model_version", sa.String(100), nullable=False),
+        sa.Column("conversation_id", models.GUID(), nullable=False),
+        sa.Column("job_id", models.GUID()),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.UniqueConstraint("tenant_id", "content_hash", "language", "model_version", name="audio_fingerprints_content_key"),
+    )
+    op.create_index("ix_audio_fingerprints_id", "audio_fingerprints", ["id"])
+    op.create_index("ix_audio_fingerprints_conversation_id", "audio_fingerprints", ["conversation_id"])
+
+def downgrade() -> None:
+    op.drop_table("audio_fingerprints")
+    op.drop_table("jobs")
+    op.drop_table("api_keys")
+    op.drop_table("conversations_test")
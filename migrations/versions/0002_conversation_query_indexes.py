@@ -0,0 +1,43 @@
+"""Composite indexes for the /conversations filters; transcripts as JSONB
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_conversations_tenant_start": ["tenant_id", "call_start_timestamp", "id"],
+    "ix_conversations_tenant_rep_start": ["tenant_id", "representative_id", "call_start_timestamp", "id"],
+    "ix_conversations_start": ["call_start_timestamp", "id"],
+}
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, "conversations_test", columns)
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "conversations_test",
+            "conversation_transcript",
+            type_=postgresql.JSONB(),
+            postgresql_using="conversation_transcript::jsonb",
+        )
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "conversations_test",
+            "conversation_transcript",
+            type_=sa.JSON(),
+            postgresql_using="conversation_transcript::json",
+        )
+    for name in INDEXES:
+        op.drop_index(name, table_name="conversations_test")
@@ -0,0 +1,21 @@
+"""Track conversations whose summary is still pending
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("conversations_test", sa.Column("summary_status", sa.String(length=20), nullable=True))
+    op.execute("UPDATE conversations_test SET summary_status = 'done' WHERE conversation_summary IS NOT NULL")
+
+def downgrade() -> None:
+    op.drop_column("conversations_test", "summary_status")
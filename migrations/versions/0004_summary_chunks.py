@@ -0,0 +1,29 @@
+"""Untruncated summaries and the chunk summary cache
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("conversations_test") as batch:
+        batch.alter_column("conversation_summary", type_=sa.Text(), existing_type=sa.String(length=255))
+    op.create_table(
+        "summary_chunks",
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+
+def downgrade() -> None:
+    op.drop_table("summary_chunks")
+    with op.batch_alter_table("conversations_test") as batch:
+        batch.alter_column("conversation_summary", type_=sa.String(length=255), existing_type=sa.Text())
@@ -0,0 +1,31 @@
+"""Compact transcript storage
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Existing rows keep their JSON transcript; new rows use the encoded columns
+JSONBType = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+def upgrade() -> None:
+    with op.batch_alter_table("conversations_test") as batch:
+        batch.add_column(sa.Column("transcript_encoded", sa.LargeBinary()))
+        batch.add_column(sa.Column("transcript_version", sa.SmallInteger()))
+        batch.alter_column("conversation_transcript", nullable=True, existing_type=JSONBType)
+
+def downgrade() -> None:
+    # Compact transcripts must be expanded back into conversation_transcript first
+    with op.batch_alter_table("conversations_test") as batch:
+        batch.alter_column("conversation_transcript", nullable=False, existing_type=JSONBType)
+        batch.drop_column("transcript_version")
+        batch.drop_column("transcript_encoded")
@@ -0,0 +1,37 @@
+"""Transcript segment search index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from app import models
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Existing conversations are indexed with `python -m app.search --reindex`
+def upgrade() -> None:
+    op.create_table(
+        "transcript_segments",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", models.GUID(), nullable=False),
+        sa.Column("call_start_timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("segment", sa.Integer(), nullable=False),
+        sa.Column("speaker", sa.String(length=100)),
+        sa.Column("timestamp", sa.Float(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("terms", models.StringArray, nullable=False),
+    )
+    op.create_index("ix_transcript_segments_tenant_start", "transcript_segments", ["tenant_id", "call_start_timestamp"])
+    op.create_index("ix_transcript_segments_conversation", "transcript_segments", ["conversation_id", "segment"])
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index("ix_transcript_segments_terms", "transcript_segments", ["terms"], postgresql_using="gin")
+
+def downgrade() -> None:
+    op.drop_table("transcript_segments")
@@ -0,0 +1,37 @@
+"""Fair scheduling of jobs and per-key rate limits
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Jobs queued before this revision get priority 0 and tag 0, so they are claimed first
+def upgrade() -> None:
+    with op.batch_alter_table("jobs") as batch:
+        batch.add_column(sa.Column("tenant_id", sa.Integer()))
+        batch.add_column(sa.Column("priority", sa.SmallInteger(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("fair_start", sa.Float(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("fair_finish", sa.Float(), nullable=False, server_default="0"))
+    op.create_index("ix_jobs_status_priority_start", "jobs", ["status", "priority", "fair_start"])
+    with op.batch_alter_table("api_keys") as batch:
+        batch.add_column(sa.Column("rate_limit_per_minute", sa.Float()))
+        batch.add_column(sa.Column("rate_limit_burst", sa.Integer()))
+
+def downgrade() -> None:
+    with op.batch_alter_table("api_keys") as batch:
+        batch.drop_column("rate_limit_burst")
+        batch.drop_column("rate_limit_per_minute")
+    op.drop_index("ix_jobs_status_priority_start", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_column("fair_finish")
+        batch.drop_column("fair_start")
+        batch.drop_column("priority")
+        batch.drop_column("tenant_id")
@@ -0,0 +1,28 @@
+"""Versioned and soft-revoked API keys, for principal cache invalidation
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("api_keys") as batch:
+        batch.add_column(sa.Column("key_version", sa.Integer(), nullable=False, server_default="1"))
+        batch.add_column(sa.Column("revoked_at", sa.TIMESTAMP(timezone=True)))
+        batch.add_column(sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")))
+    op.create_index("ix_api_keys_updated_at", "api_keys", ["updated_at"])
+
+def downgrade() -> None:
+    op.drop_index("ix_api_keys_updated_at", table_name="api_keys")
+    with op.batch_alter_table("api_keys") as batch:
+        batch.drop_column("updated_at")
+        batch.drop_column("revoked_at")
+        batch.drop_column("key_version")
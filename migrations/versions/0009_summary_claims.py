@@ -0,0 +1,20 @@
+"""Claims on pending summaries, so retries hold no row locks while summarizing
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("conversations_test", sa.Column("summary_claimed_at", sa.TIMESTAMP(timezone=True), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column("conversations_test", "summary_claimed_at")